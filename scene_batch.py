@@ -0,0 +1,104 @@
+import argparse
+import glob
+import json
+import os
+import sys
+
+from scene_understanding_final import SceneUnderstander
+
+def find_scene_files(paths): #expand directories and glob patterns into a sorted list of scene files
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(glob.glob(os.path.join(path, "*.json")) + glob.glob(os.path.join(path, "*.scnb")))
+        elif glob.has_magic(path):
+            files.extend(glob.glob(path, recursive=True))
+        else:
+            files.append(path)
+    files = sorted(dict.fromkeys(files))
+    selected = set(files)
+    return [f for f in files if not is_converted(f, selected)]
+
+def is_converted(file_name, selected): #one of a scene's two selected copies, X.json and its scene_convert output X.scnb: keep the .scnb unless the .json is newer
+    stem, extension = os.path.splitext(file_name)
+    other = stem + (".json" if extension == ".scnb" else ".scnb")
+    if extension not in (".json", ".scnb") or other not in selected:
+        return False
+    try:
+        json_newer = os.path.getmtime(stem + ".json") > os.path.getmtime(stem + ".scnb")
+    except OSError: #missing: analyze_file reports it
+        return False
+    return json_newer if extension == ".scnb" else not json_newer
+
+def numpy_available(): #without importing it
+    import importlib.util
+    return importlib.util.find_spec("numpy") is not None
+
+def analyze_file(file_name, needs_flip, vectorized=False, stats_dir=None, cache_dir=None, cache_bytes=256 << 20, links_dir=None, workers=None, graph_dir=None, graph_format="json"): #worker: load and analyze one scene; workers shards the scene itself
+    cache = None
+    if cache_dir:
+        from scene_cache import shared_cache
+        cache = shared_cache(cache_dir, cache_bytes)
+    scene_understander = SceneUnderstander()
+    if file_name.endswith(".scnb"): #binary columnar scene written by scene_convert
+        scene_understander.load_binary(file_name)
+    else: #raises on unreadable or truncated files, unlike load_file
+        scene_understander.load_file_streaming(file_name)
+    if not len(scene_understander.vertices):
+        raise ValueError(f"no vertices in {file_name}")
+    stem = os.path.splitext(os.path.basename(file_name))[0]
+    stats_file = None
+    if stats_dir:
+        stats_file = os.path.join(stats_dir, stem + ".stats.json")
+    result = scene_understander.analyze_scene(needs_flip, vectorized, stats_file, cache, workers)
+    if links_dir and not scene_understander.cache_hit: #cached results keep only the deduplicated links
+        scene_understander.link_table.dump(os.path.join(links_dir, stem + ".links.json"), scene_understander.vertices)
+    if graph_dir:
+        scene_understander.region_graph().dump(os.path.join(graph_dir, f"{stem}.graph.{graph_format}"))
+    return {"file": file_name, "needs_flip": scene_understander.needs_flip, **result.to_dict()}
+
+def run_batch(files, needs_flip=None, workers=None, vectorized=False, stats_dir=None, cache_dir=None, cache_bytes=256 << 20, links_dir=None, graph_dir=None, graph_format="json"): #yield (file, result, error) as each scene finishes
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(analyze_file, f, needs_flip, vectorized, stats_dir, cache_dir, cache_bytes, links_dir, None, graph_dir, graph_format): f for f in files}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e: #report the scene and keep going
+                yield futures[future], None, e
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze many scene files in parallel.")
+    parser.add_argument("paths", nargs="+", help="scene files (JSON or .scnb), directories or glob patterns")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    flip = parser.add_mutually_exclusive_group()
+    flip.add_argument("--flip", dest="needs_flip", action="store_const", const=True, default=None, help="assume a downward y axis for every scene (default: detect it per scene)")
+    flip.add_argument("--no-flip", dest="needs_flip", action="store_const", const=False, help="assume an upward y axis for every scene")
+    parser.add_argument("--vectorized", action="store_true", help="classify vertices with the numpy batch pass (the same results without numpy)")
+    parser.add_argument("--stats-dir", help="write per-scene timings and counters as <scene>.stats.json here")
+    parser.add_argument("--links-dir", help="write each scene's link table (pair counts and producing vertices) as <scene>.links.json here")
+    parser.add_argument("--graph-dir", help="write each scene's region adjacency graph and region -> body labels as <scene>.graph.<format> here")
+    parser.add_argument("--graph-format", choices=("json", "npz"), default="json", help="file format for --graph-dir (default: json; npz needs numpy)")
+    parser.add_argument("--cache-dir", help="reuse results of previously analyzed identical scenes from this directory")
+    parser.add_argument("--cache-size", type=float, default=256, help="cache size limit in MB (default: 256)")
+    args = parser.parse_args()
+    if args.graph_dir and args.graph_format == "npz" and not numpy_available():
+        parser.error("--graph-format npz needs numpy")
+
+    files = find_scene_files(args.paths)
+    for directory in (args.stats_dir, args.links_dir, args.graph_dir):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    failed = 0
+    batch = run_batch(files, args.needs_flip, args.workers, args.vectorized, args.stats_dir, args.cache_dir, int(args.cache_size * (1 << 20)), args.links_dir, args.graph_dir, args.graph_format)
+    for file_name, result, error in batch:
+        if error is None:
+            print(json.dumps(result), flush=True)
+        else:
+            failed += 1
+            print(f"FAILED {file_name}: {error}", file=sys.stderr, flush=True)
+    print(f"{len(files) - failed}/{len(files)} scenes analyzed", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
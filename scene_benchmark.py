@@ -0,0 +1,180 @@
+import argparse
+import json
+import math
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from scene_understanding_final import SceneUnderstander
+
+# Object templates in the scene format, y axis pointing up (needs_flip=False).
+# Regions 1..n belong to the object, 0 is the shared background.
+TEMPLATES = {
+    "cube": { # cube.json: three visible faces, one body
+        "size": (10, 10),
+        "vertices": [
+            ("A", (1, 1), ["B", 0, "G", 1, "B"]),
+            ("B", (1, 5), ["C", 0, "A", 1, "E", 2, "C"]),
+            ("C", (3, 7), ["B", 2, "D", 0, "B"]),
+            ("D", (8, 7), ["C", 2, "E", 3, "F", 0, "C"]),
+            ("E", (6, 5), ["D", 2, "B", 1, "G", 3, "D"]),
+            ("F", (8, 3), ["D", 3, "G", 0, "D"]),
+            ("G", (6, 1), ["F", 3, "E", 1, "A", 0, "F"])
+        ],
+        "regions": 3,
+        "bodies": [[1, 2, 3]]
+    },
+    "stacked": { # one.json with y flipped: a prism resting on another, two bodies
+        "size": (800, 1100),
+        "vertices": [
+            ("A", (156, 11), ["B", 1, "C", 2, "E", 0, "B"]),
+            ("B", (720, 11), ["C", 1, "A", 0, "C"]),
+            ("C", (718, 226), ["K", 2, "A", 1, "B", 0, "K"]),
+            ("D", (351, 254), ["H", 4, "E", 2, "K", 3, "H"]),
+            ("E", (222, 325), ["F", 0, "A", 2, "D", 4, "F"]),
+            ("F", (101, 392), ["E", 4, "G", 0, "E"]),
+            ("G", (189, 1024), ["F", 4, "H", 5, "I", 0, "F"]),
+            ("H", (314, 713), ["G", 4, "D", 3, "I", 5, "G"]),
+            ("I", (489, 841), ["J", 0, "G", 5, "H", 3, "J"]),
+            ("J", (677, 389), ["I", 3, "K", 0, "I"]),
+            ("K", (540, 326), ["J", 3, "D", 2, "C", 0, "J"])
+        ],
+        "regions": 5,
+        "bodies": [[1, 2], [3, 4, 5]]
+    }
+}
+LAYOUTS = {"cube": ["cube"], "stacked": ["stacked"], "mixed": ["cube", "stacked"]}
+
+def generate_scene(vertex_target, layout="mixed"): #tile template objects on a grid until about vertex_target vertices
+    templates = [TEMPLATES[name] for name in LAYOUTS[layout]]
+    per_round = sum(len(t["vertices"]) for t in templates) / len(templates)
+    objects = max(1, round(vertex_target / per_round))
+    columns = math.ceil(math.sqrt(objects))
+    cell_w = max(t["size"][0] for t in templates) + 10
+    cell_h = max(t["size"][1] for t in templates) + 10
+    vertex_data, bodies = [], []
+    next_region = 1
+    for k in range(objects):
+        template = templates[k % len(templates)]
+        dx, dy = (k % columns) * cell_w, (k // columns) * cell_h
+        region_map = {0: 0}
+        for r in range(1, template["regions"] + 1):
+            region_map[r] = next_region
+            next_region += 1
+        for vid, (x, y), kind_list in template["vertices"]:
+            vertex_data.append({
+                "id": f"{vid}{k}",
+                "coords": [x + dx, y + dy],
+                "kind-list": [f"{item}{k}" if isinstance(item, str) else region_map[item] for item in kind_list]
+            })
+        bodies.extend([region_map[r] for r in body] for body in template["bodies"])
+    return {"vertex-data": vertex_data, "background": 0}, sorted(bodies)
+
+def bodies_digest(bodies): #compact fingerprint of a sorted body list, so the timed process never holds the expected bodies
+    import hashlib
+    return hashlib.blake2b(repr(sorted(bodies)).encode(), digest_size=16).hexdigest()
+
+def prepare_size(vertex_target, layout, binary=False): #write one generated scene to a temporary file; runs in its own process so the generator's memory never counts
+    scene, expected = generate_scene(vertex_target, layout)
+    vertices = len(scene["vertex-data"])
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as file:
+        json.dump(scene, file)
+    del scene
+    file_name = file.name
+    if binary: #convert ahead of time, like scene_convert would
+        converter = SceneUnderstander()
+        converter.load_file_streaming(file_name)
+        os.unlink(file_name)
+        with tempfile.NamedTemporaryFile(suffix=".scnb", delete=False) as file:
+            file_name = file.name
+        converter.save_binary(file_name)
+    return file_name, vertices, len(expected), bodies_digest(expected)
+
+def run_size(file_name, vectorized, streaming, binary=False, workers=None, type_cache_size=0): #time one prepared scene; runs in its own fresh process so peak RSS is the pipeline's
+    scene_understander = SceneUnderstander(type_cache_size=type_cache_size)
+    start = time.perf_counter()
+    if binary:
+        scene_understander.load_binary(file_name)
+    elif streaming:
+        scene_understander.load_file_streaming(file_name)
+    else:
+        scene_understander.load_file(file_name)
+    result = scene_understander.analyze_scene(False, vectorized, workers=workers)
+    total = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss #KiB on Linux, bytes on macOS
+    if sys.platform == "darwin":
+        peak //= 1024
+    return {
+        "timings": scene_understander.stats.timings,
+        "counters": scene_understander.stats.counters,
+        "total": total,
+        "peak_rss_mb": peak / 1024,
+        "bodies": len(result.bodies),
+        "bodies_digest": bodies_digest(result.bodies)
+    }
+
+def benchmark_size(vertex_target, layout, vectorized, streaming, binary=False, workers=None, type_cache_size=0): #prepare and time one size, each step in a fresh process
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        file_name, vertices, expected_bodies, expected_digest = pool.submit(prepare_size, vertex_target, layout, binary).result()
+    try:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            record = pool.submit(run_size, file_name, vectorized, streaming, binary, workers, type_cache_size).result()
+    finally:
+        os.unlink(file_name)
+    total = record["total"]
+    return {
+        "layout": layout,
+        "vertices": vertices,
+        "timings": record["timings"],
+        "counters": record["counters"],
+        "total": total,
+        "vertices_per_second": vertices / total if total else None,
+        "peak_rss_mb": record["peak_rss_mb"],
+        "bodies": record["bodies"],
+        "expected_bodies": expected_bodies,
+        "correct": record["bodies_digest"] == expected_digest
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SceneUnderstander on generated scenes of growing size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000, 1000000], help="approximate vertex counts")
+    parser.add_argument("--layout", choices=sorted(LAYOUTS), default="mixed")
+    parser.add_argument("--vectorized", action="store_true", help="use the numpy classification pass")
+    parser.add_argument("--streaming", action="store_true", help="load with load_file_streaming")
+    parser.add_argument("--binary", action="store_true", help="convert to the binary format first and load with load_binary")
+    parser.add_argument("--workers", type=int, help="shard classification and linking over this many processes")
+    parser.add_argument("--type-cache", type=int, default=0, metavar="N", help="memoize junction types for up to N quantised angle signatures")
+    parser.add_argument("--json", help="also write the records to this file")
+    parser.add_argument("--write", metavar="DIR", help="only write the generated scenes to DIR")
+    args = parser.parse_args()
+
+    if args.write:
+        os.makedirs(args.write, exist_ok=True)
+        for size in args.sizes:
+            scene, expected = generate_scene(size, args.layout)
+            file_name = os.path.join(args.write, f"{args.layout}_{size}.json")
+            with open(file_name, "w") as file:
+                json.dump(scene, file)
+            print(f"{file_name}: {len(scene['vertex-data'])} vertices, {len(expected)} bodies")
+        return 0
+
+    stages = ["load_file", "create_vertices", "analyze_vertices", "global_grouping", "singlebody"]
+    print(f"{'vertices':>9} " + " ".join(f"{s:>16}" for s in stages) + f" {'total':>9} {'vert/s':>10} {'peak MB':>8}  bodies")
+    records = []
+    for size in args.sizes:
+        record = benchmark_size(size, args.layout, args.vectorized, args.streaming, args.binary, args.workers, args.type_cache)
+        records.append(record)
+        print(f"{record['vertices']:>9} "
+              + " ".join(f"{record['timings'].get(s, 0.0):>16.4f}" for s in stages)
+              + f" {record['total']:>9.3f} {record['vertices_per_second']:>10.0f} {record['peak_rss_mb']:>8.1f}"
+              + f"  {record['bodies']}/{record['expected_bodies']} {'ok' if record['correct'] else 'MISMATCH'}", flush=True)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(records, file, indent=2)
+    return 0 if all(r["correct"] for r in records) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
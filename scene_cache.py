@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+
+shared = {} #(directory, max_bytes) -> SceneCache, so each worker process opens a cache once
+
+def shared_cache(directory, max_bytes=256 << 20):
+    cache = shared.get((directory, max_bytes))
+    if cache is None:
+        cache = shared[directory, max_bytes] = SceneCache(directory, max_bytes)
+    return cache
+
+class SceneCache: #on-disk store of SceneResult dicts keyed by SceneUnderstander.scene_key, least recently used evicted first
+    def __init__(self, directory, max_bytes=256 << 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = None #bytes in the directory, counted on the first put and recounted when evicting
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def __repr__(self):
+        return f"SceneCache({self.directory!r}, hits={self.hits}, misses={self.misses}, evictions={self.evictions})"
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, key): #cached result dict or None; a hit touches the entry so it counts as recently used
+        path = self.path(key)
+        try:
+            with open(path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError): #missing, evicted by another process, or unreadable
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError: #read-only or shared cache: still a hit, only the eviction order goes stale
+            pass
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        payload = json.dumps(data, separators=(",", ":")).encode()
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(payload)
+            os.chmod(tmp_name, 0o644) #mkstemp creates 0600; let other users' runs read the entry
+            os.replace(tmp_name, self.path(key)) #atomic, so concurrent readers never see half an entry
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+        if self.size is None:
+            self.size = sum(size for _, size, _ in self.entries())
+        else:
+            self.size += len(payload)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def entries(self): #(last use, size, path) of every entry, oldest first
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".json"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError: #removed by another process meanwhile
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        entries.sort()
+        return entries
+
+    def evict(self): #drop least recently used entries until the cache fits in max_bytes again
+        entries = self.entries() #recount, other processes may share the directory
+        self.size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.size <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            self.size -= size
+            self.evictions += 1
+
+    def clear(self):
+        for _, _, path in self.entries():
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        self.size = 0
+
+    def __len__(self):
+        return len(self.entries())
@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# Command-line entry point, run as: python scene_cli.py analyze FILE... (program name scene-understanding).
+# Each command imports what it needs when it runs, so one drawing per process starts without numpy or the process pool.
+HEAVY_MODULES = ("numpy", "concurrent.futures.process", "multiprocessing.shared_memory", "hashlib")
+
+def analyze(args): #one NDJSON result line per scene, in file name order
+    from scene_batch import find_scene_files
+    files = find_scene_files(args.files)
+    if args.graph_dir:
+        os.makedirs(args.graph_dir, exist_ok=True)
+    cache_bytes = int(args.cache_size * (1 << 20))
+    failed = 0
+    if args.jobs and args.jobs > 1 and len(files) > 1: #several scenes at once on the batch pool
+        from scene_batch import run_batch
+        results = {}
+        for file_name, result, error in run_batch(files, args.needs_flip, args.jobs, args.vectorized, None, args.cache_dir, cache_bytes, None, args.graph_dir, args.graph_format):
+            results[file_name] = (result, error)
+        outcomes = [(f, *results[f]) for f in files]
+    else:
+        outcomes = ((f, *analyze_in_process(f, args, cache_bytes)) for f in files)
+    for file_name, result, error in outcomes:
+        if error is None:
+            print(json.dumps(result, indent=args.indent), flush=True)
+        else:
+            failed += 1
+            print(f"FAILED {file_name}: {error}", file=sys.stderr, flush=True)
+    return 1 if failed or not files else 0
+
+def analyze_in_process(file_name, args, cache_bytes): #(result, error) for one scene, without a worker pool
+    from scene_batch import analyze_file
+    try:
+        return analyze_file(file_name, args.needs_flip, args.vectorized, None, args.cache_dir, cache_bytes, None, args.workers, args.graph_dir, args.graph_format), None
+    except Exception as e: #report the scene and keep going
+        return None, e
+
+def startup(args): #launch -> first result line of "analyze", against a bare interpreter start
+    import subprocess
+    script = os.path.abspath(__file__)
+    modes = [("python -c pass", [sys.executable, "-c", "pass"])]
+    modes.append(("analyze", [sys.executable, script, "analyze", args.file]))
+    from scene_batch import numpy_available
+    if numpy_available(): #without numpy it would time the pure-Python pass, and importtime would list the failed numpy import
+        modes.append(("analyze --vectorized", [sys.executable, script, "analyze", "--vectorized", args.file]))
+    else:
+        print("numpy is not installed, skipping analyze --vectorized", file=sys.stderr)
+    records = []
+    print(f"{'mode':<24} {'min ms':>8} {'median ms':>10}  heavy imports")
+    for name, command in modes:
+        times = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True) as process:
+                process.stdout.readline() #first result (or EOF for the bare interpreter)
+                times.append(time.perf_counter() - start)
+                process.stdout.read()
+        log = subprocess.run([sys.executable, "-X", "importtime"] + command[1:], capture_output=True, text=True).stderr
+        imported = {line.rsplit("|", 1)[1].strip() for line in log.splitlines() if line.startswith("import time:")}
+        heavy = [m for m in HEAVY_MODULES if m in imported]
+        times.sort()
+        record = {"mode": name, "runs": args.runs, "min": times[0], "median": times[len(times) // 2], "heavy_imports": heavy}
+        records.append(record)
+        print(f"{name:<24} {1000 * record['min']:>8.1f} {1000 * record['median']:>10.1f}  {', '.join(heavy) or '-'}", flush=True)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(records, file, indent=2)
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="scene-understanding", description="Find the bodies in line-drawing scenes.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("analyze", help="analyze scene files (JSON or .scnb) and print one JSON result per scene")
+    command.add_argument("files", nargs="+", help="scene files, directories or glob patterns")
+    flip = command.add_mutually_exclusive_group()
+    flip.add_argument("--flip", dest="needs_flip", action="store_const", const=True, default=None, help="assume a downward y axis (default: detect it per scene)")
+    flip.add_argument("--no-flip", dest="needs_flip", action="store_const", const=False, help="assume an upward y axis")
+    command.add_argument("--vectorized", action="store_true", help="classify vertices with the numpy batch pass (the same results without numpy)")
+    command.add_argument("--workers", type=int, help="shard each scene's classification and linking over this many processes")
+    command.add_argument("--jobs", type=int, help="analyze this many scenes at once (results still in file name order)")
+    command.add_argument("--cache-dir", help="reuse results of previously analyzed identical scenes from this directory")
+    command.add_argument("--cache-size", type=float, default=256, help="cache size limit in MB (default: 256)")
+    command.add_argument("--graph-dir", help="also write each scene's region adjacency graph and body labels as <scene>.graph.<format> here")
+    command.add_argument("--graph-format", choices=("json", "npz"), default="json", help="file format for --graph-dir (default: json; npz needs numpy)")
+    command.add_argument("--indent", type=int, help="pretty-print results with this indent")
+    command.set_defaults(run=analyze)
+
+    command = commands.add_parser("startup", help="time from launch to the first result of analyze")
+    command.add_argument("file", nargs="?", default="cube.json", help="scene to analyze (default: cube.json)")
+    command.add_argument("--runs", type=int, default=20, help="launches per mode (default: 20)")
+    command.add_argument("--json", help="also write the records to this file")
+    command.set_defaults(run=startup)
+
+    args = parser.parse_args(argv)
+    if args.command == "analyze" and args.graph_dir and args.graph_format == "npz":
+        from scene_batch import numpy_available
+        if not numpy_available():
+            parser.error("--graph-format npz needs numpy")
+    return args.run(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
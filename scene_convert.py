@@ -0,0 +1,40 @@
+import argparse
+import os
+import sys
+import time
+
+from scene_understanding_final import SceneUnderstander
+
+def convert_file(json_file, binary_file): #JSON scene -> binary columnar scene (.scnb), returns the vertex count
+    scene_understander = SceneUnderstander()
+    scene_understander.load_file_streaming(json_file)
+    if not len(scene_understander.vertices):
+        raise ValueError(f"no vertices in {json_file}")
+    scene_understander.save_binary(binary_file)
+    return len(scene_understander.vertices)
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert JSON scene files to the binary columnar format read by SceneUnderstander.load_binary.")
+    parser.add_argument("files", nargs="+", help="JSON scene files")
+    parser.add_argument("-o", "--output-dir", help="write the .scnb files here (default: next to each input)")
+    args = parser.parse_args()
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    failed = 0
+    for json_file in args.files:
+        binary_file = os.path.splitext(json_file)[0] + ".scnb"
+        if args.output_dir:
+            binary_file = os.path.join(args.output_dir, os.path.basename(binary_file))
+        start = time.perf_counter()
+        try:
+            count = convert_file(json_file, binary_file)
+        except Exception as e:
+            failed += 1
+            print(f"FAILED {json_file}: {e}", file=sys.stderr)
+            continue
+        print(f"{json_file} -> {binary_file}: {count} vertices, {os.path.getsize(json_file)} -> {os.path.getsize(binary_file)} bytes in {time.perf_counter() - start:.3f}s")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import stat
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from scene_cache import shared_cache
+from scene_understanding_final import SceneUnderstander
+
+def analyze_document(line, needs_flip=None, vectorized=False, cache_dir=None, cache_bytes=256 << 20): #worker: one NDJSON scene -> (id, result dict)
+    data = json.loads(line)
+    scene_understander = SceneUnderstander()
+    scene_understander.load_data(data)
+    cache = shared_cache(cache_dir, cache_bytes) if cache_dir else None
+    result = scene_understander.analyze_scene(data.get("needs_flip", needs_flip), vectorized, cache=cache)
+    return data.get("id"), {"needs_flip": scene_understander.needs_flip, **result.to_dict()}
+
+class SceneServer: #reads NDJSON scenes, analyzes them on a process pool and streams NDJSON results back
+    def __init__(self, pool, concurrency=8, ordered=False, needs_flip=None, vectorized=False, cache_dir=None, cache_bytes=256 << 20):
+        self.pool = pool
+        self.slots = asyncio.Semaphore(concurrency) #scenes in flight across all connections; reading stops while none are free
+        self.ordered = ordered
+        self.options = (needs_flip, vectorized, cache_dir, cache_bytes)
+
+    async def analyze(self, seq, line):
+        try:
+            scene_id, result = await asyncio.get_running_loop().run_in_executor(self.pool, analyze_document, line, *self.options)
+            return {"id": scene_id if scene_id is not None else seq, "seq": seq, **result}
+        except Exception as e: #report the scene and keep serving
+            try:
+                scene_id = json.loads(line).get("id", seq)
+            except Exception:
+                scene_id = seq
+            return {"id": scene_id, "seq": seq, "error": f"{type(e).__name__}: {e}"}
+
+    async def serve(self, read_line, write): #read_line() -> bytes (b"" at EOF); write(bytes) is awaited, so slow readers hold back new work
+        pending = {} #seq -> finished result waiting for its turn (ordered mode)
+        next_seq = 0
+        held = 0 #slots taken by scenes of this stream that are read but not yet written
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def emit(record):
+            nonlocal held
+            await write((json.dumps(record, separators=(",", ":")) + "\n").encode())
+            held -= 1
+            self.slots.release()
+
+        async def run(seq, line):
+            nonlocal next_seq
+            record = await self.analyze(seq, line)
+            async with lock:
+                if not self.ordered:
+                    await emit(record)
+                    return
+                pending[seq] = record
+                while next_seq in pending:
+                    await emit(pending.pop(next_seq))
+                    next_seq += 1
+
+        seq = 0
+        try:
+            while True:
+                await self.slots.acquire()
+                held += 1
+                line = await read_line()
+                if not line.strip(): #end of input, or a blank line
+                    held -= 1
+                    self.slots.release()
+                    if not line:
+                        break
+                    continue
+                task = asyncio.create_task(run(seq, line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                seq += 1
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally: #the peer went away: drop its work and give its slots back
+            for task in tasks:
+                task.cancel()
+            for _ in range(held):
+                self.slots.release()
+        return seq
+
+    async def handle_connection(self, reader, writer):
+        async def write(data):
+            writer.write(data)
+            await writer.drain()
+        try:
+            await self.serve(reader.readline, write)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve_stdio(self): #stdin may be a file or a pipe, so read and write it on a thread instead of through the event loop
+        loop = asyncio.get_running_loop()
+        stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+
+        def write_line(data):
+            stdout.write(data)
+            stdout.flush()
+
+        async def write(data):
+            await loop.run_in_executor(None, write_line, data)
+
+        return await self.serve(lambda: loop.run_in_executor(None, stdin.readline), write)
+
+async def run_server(args):
+    #forked workers would inherit open client sockets and keep them from closing, so start them from a clean forkserver
+    context = multiprocessing.get_context("forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else None)
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context) as pool:
+        server = SceneServer(pool, args.concurrency, args.ordered, args.needs_flip, args.vectorized, args.cache_dir, int(args.cache_size * (1 << 20)))
+        if args.unix:
+            if os.path.exists(args.unix) and stat.S_ISSOCK(os.stat(args.unix).st_mode): #left over from a previous run
+                os.unlink(args.unix)
+            listener = await asyncio.start_unix_server(server.handle_connection, args.unix, limit=args.max_line)
+        elif args.tcp:
+            host, _, port = args.tcp.rpartition(":")
+            listener = await asyncio.start_server(server.handle_connection, host or "127.0.0.1", int(port), limit=args.max_line)
+        else:
+            count = await server.serve_stdio()
+            print(f"{count} scenes served", file=sys.stderr)
+            return
+        print(f"serving on {args.unix or args.tcp}", file=sys.stderr, flush=True)
+        async with listener:
+            await listener.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-running scene analysis service: NDJSON scenes in, NDJSON results out.")
+    transport = parser.add_mutually_exclusive_group()
+    transport.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of stdin/stdout")
+    transport.add_argument("--tcp", metavar="[HOST:]PORT", help="listen on a TCP socket (host defaults to 127.0.0.1)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--concurrency", type=int, default=None, help="scenes in flight before input is paused (default: 2 per worker)")
+    parser.add_argument("--ordered", action="store_true", help="emit results in input order instead of as they finish")
+    flip = parser.add_mutually_exclusive_group()
+    flip.add_argument("--flip", dest="needs_flip", action="store_const", const=True, default=None, help="assume a downward y axis for scenes that do not set needs_flip (default: detect it per scene)")
+    flip.add_argument("--no-flip", dest="needs_flip", action="store_const", const=False, help="assume an upward y axis for scenes that do not set needs_flip")
+    parser.add_argument("--vectorized", action="store_true", help="classify vertices with the numpy batch pass (the same results without numpy)")
+    parser.add_argument("--cache-dir", help="reuse results of previously analyzed identical scenes from this directory")
+    parser.add_argument("--cache-size", type=float, default=256, help="cache size limit in MB (default: 256)")
+    parser.add_argument("--max-line", type=int, default=1 << 28, help="longest accepted scene line on sockets, in bytes")
+    args = parser.parse_args()
+    if args.concurrency is None:
+        args.concurrency = 2 * (args.workers or os.cpu_count() or 1)
+
+    try:
+        asyncio.run(run_server(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+import math
+
+# Interchangeable pipeline stages for SceneUnderstander. Each prototype of the pipeline
+# (scene_understanding.py, global_testing.py, global.py) is a combination of these.
+# Groupers get the deduplicated links as {(r1, r2): multiplicity} with r1 <= r2.
+
+class TypeCache: #bounded memo of 3-junction types keyed on (neighbor count, sorted quantised angles)
+    def __init__(self, thresholds, quantum=0.5, max_size=4096): #thresholds: angles where the rule can change its answer
+        self.quantum = quantum #degrees per signature step
+        self.max_size = max_size
+        self.types = {} #signature -> type, oldest first
+        self.unsafe = {round(t / quantum) + d for t in thresholds for d in (-1, 0, 1)} #steps touching a threshold: classified directly, so cached types are exact
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+
+    def classify(self, angles, rule):
+        steps = [round(a / self.quantum) for a in angles]
+        if not self.unsafe.isdisjoint(steps):
+            self.bypassed += 1
+            return rule(angles)
+        steps.sort() #the rules only ask whether any angle passes a threshold, so wedge order does not matter
+        signature = (len(steps), *steps)
+        vertex_type = self.types.get(signature)
+        if vertex_type is not None:
+            self.hits += 1
+            return vertex_type
+        self.misses += 1
+        vertex_type = self.types[signature] = rule(angles)
+        if len(self.types) > self.max_size: #drop the oldest signature
+            del self.types[next(iter(self.types))]
+            self.evictions += 1
+        return vertex_type
+
+    def counters(self):
+        return {"type_cache_hits": self.hits, "type_cache_misses": self.misses, "type_cache_bypassed": self.bypassed, "type_cache_evictions": self.evictions}
+
+class Atan2Classifier: #ccw difference of the two edge directions, T within 5 degrees of 180, ARROW above 180
+    name = "atan2"
+    vectorized = True #SceneUnderstander.classify_vertices_vectorized computes the same types and angles
+    thresholds = (175, 180, 185)
+
+    def __init__(self, type_cache=None):
+        self.type_cache = type_cache
+
+    def classify(self, vertex, vertices, needs_flip, trace=False):
+        vertex.calculate_vertex_type(vertices, needs_flip, trace, self.type_cache)
+
+class CrossDotClassifier: #global.py's rules on the shared edge table: ARROW above 180 before T (170-190), every wedge kept
+    name = "cross_dot"
+    vectorized = False
+    thresholds = (170, 180, 190)
+
+    def __init__(self, type_cache=None):
+        self.type_cache = type_cache
+
+    def classify(self, vertex, vertices, needs_flip, trace=False):
+        table = vertex.table #global.py took atan2(cross, dot) per wedge; the edge table difference can differ from it in the last ulp
+        start = table.neighbor_start[vertex.row]
+        slots = [i for i in range(table.neighbor_count[vertex.row]) if table.defined[table.neighbors[start + i]]]
+        neighbors = vertex.neighbors
+        angles = []
+        for k in range(len(slots)):
+            i, j = slots[k], slots[(k + 1) % len(slots)]
+            angle = vertex.wedge_angle(i, j)
+            if abs(angle - 180) < 1e-9: #ARROW starts just above 180, so straight wedges take global.py's exact formula
+                a, b = table.neighbors[start + i], table.neighbors[start + j] #rows, so shard workers never need the id index
+                angle = self.cross_dot_angle(vertex, (table.xs[a], table.ys[a]), (table.xs[b], table.ys[b]), needs_flip)
+            if trace:
+                print("The angle from ", neighbors[i], " to ", vertex.id, " to ", neighbors[j], " is ", angle)
+            angles.append(angle)
+        vertex_type = None #global.py used "" for anything but two or three neighbors
+        if len(vertex.neighbors) == 2:
+            vertex_type = "L"
+        elif len(vertex.neighbors) == 3 and angles:
+            vertex_type = self.type_cache.classify(angles, self.junction_type) if self.type_cache is not None else self.junction_type(angles)
+        vertex.angles = angles
+        vertex.vertex_type = vertex_type
+        if trace:
+            print("The vertex", vertex.id, "is of type", vertex_type)
+
+    @staticmethod
+    def junction_type(angles):
+        max_angle = max(angles)
+        if max_angle > 180:
+            return "ARROW"
+        elif 170 <= max_angle <= 190:
+            return "T"
+        return "FORK"
+
+    def cross_dot_angle(self, vertex, coords1, coords2, needs_flip): #global.py: atan2(cross, dot) of the two edge vectors, in [0, 360)
+        x, y = vertex.coords
+        x1, y1 = coords1
+        x2, y2 = coords2
+        v1_x, v1_y = x1 - x, (y - y1 if needs_flip else y1 - y)
+        v2_x, v2_y = x2 - x, (y - y2 if needs_flip else y2 - y)
+        angle = math.degrees(math.atan2(v1_x * v2_y - v1_y * v2_x, v1_x * v2_x + v1_y * v2_y))
+        if angle < 0:
+            angle += 360
+        return angle
+
+class MaxAngleLinker: #FORK links every pair of non-background regions, ARROW the two regions beside the smaller angles
+    name = "max_angle"
+
+    def link(self, vertex, background, trace=False):
+        return vertex.region_linking(background, trace)
+
+class FirstTwoLinker: #global.py: FORK links every pair of regions, ARROW the first two; background links dropped afterwards
+    name = "first_two"
+
+    def link(self, vertex, background, trace=False):
+        regions = vertex.regions
+        links = []
+        if len(regions) < 2:
+            return links
+        if vertex.vertex_type == "FORK":
+            links = [tuple(sorted((regions[i], regions[j]))) for i in range(len(regions)) for j in range(i + 1, len(regions))]
+        elif vertex.vertex_type == "ARROW" and len(vertex.angles) >= 2:
+            links = [tuple(sorted((regions[0], regions[1])))]
+        if background is not None:
+            links = [link for link in links if background not in link]
+        if trace:
+            for link in links:
+                print("Linked Regions:", link[0], link[1], "at", vertex.vertex_type, "vertex", vertex.id)
+        return links
+
+class GlobalSinglebodyGrouper: #merge nuclei sharing 2+ links, then fold single-region nuclei with one link into their neighbor
+    name = "global_singlebody"
+
+    def group(self, scene, links):
+        return scene.group_links(links)
+
+    def merge(self, scene, nuclei):
+        return scene.merge_single_regions(nuclei)
+
+class ComponentsGrouper: #global.py: every connected component of the link graph is a body
+    name = "components"
+
+    def group(self, scene, links):
+        parent = {}
+
+        def find(r):
+            while parent[r] != r:
+                parent[r] = parent[parent[r]]
+                r = parent[r]
+            return r
+
+        for r1, r2 in links:
+            parent.setdefault(r1, r1)
+            parent.setdefault(r2, r2)
+            a, b = find(r1), find(r2)
+            if a != b:
+                parent[b] = a
+        nuclei = {}
+        for r in parent: #components in order of their first region
+            nuclei.setdefault(find(r), scene.Nucleus([])).regions.add(r)
+        for link in links:
+            nuclei[find(link[0])].links.add(link)
+        return list(nuclei.values())
+
+    def merge(self, scene, nuclei): #single_body_gen's single-region pass never fires on connected components
+        return nuclei
+
+CLASSIFIERS = {c.name: c for c in (Atan2Classifier, CrossDotClassifier)}
+LINKERS = {c.name: c for c in (MaxAngleLinker, FirstTwoLinker)}
+GROUPERS = {c.name: c for c in (GlobalSinglebodyGrouper, ComponentsGrouper)}
+
+VARIANTS = { #prototype -> (classifier, linker, grouper)
+    "final": ("atan2", "max_angle", "global_singlebody"),
+    "scene_understanding": ("atan2", "max_angle", "global_singlebody"),
+    "global_testing": ("atan2", "max_angle", "global_singlebody"),
+    "global": ("cross_dot", "first_two", "components")
+}
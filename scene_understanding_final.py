@@ -1,44 +1,711 @@
+import bisect
+import contextlib
 import json
 import math
+import struct
+import sys
+import time
+from array import array
+from collections import deque
+from collections.abc import Mapping
+
+from scene_strategies import CLASSIFIERS, GROUPERS, LINKERS, VARIANTS, TypeCache
+
+# Modules only some modes need (numpy, hashlib, mmap, the process pool) are imported where they are used,
+# so a short-lived run on one small drawing starts fast.
+np = None #numpy once numpy_for imported it, False if it is not installed
+NUMPY_MIN_ITEMS = 4096 #smaller passes take the pure-Python paths, which give the same results without the numpy import
+
+def numpy_for(items=NUMPY_MIN_ITEMS): #numpy for a pass over this many items, or None to take the pure-Python path
+    global np
+    if items < NUMPY_MIN_ITEMS:
+        return None
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+        np = numpy
+    return np or None
+
+TRUNCATED_TAIL = 16 #decode errors this close to the end of the buffer may be a value cut by the chunk boundary
+
+def iter_scene_document(file, chunk_size=1 << 16): #yield (key, value) per top-level key, one vertex at a time for "vertex-data"
+    decoder = json.JSONDecoder()
+    buf, pos = "", 0
+    base = 0 #document offset of buf[0]
+
+    def peek(): #next non-whitespace character, reading more of the file when needed
+        nonlocal buf, pos, base
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            base += len(buf)
+            buf, pos = file.read(chunk_size), 0
+            if not buf:
+                return ""
+
+    def expect(char):
+        nonlocal pos
+        if peek() != char:
+            raise ValueError(f"expected {char!r} at char {base + pos} of scene document, found {peek()!r}")
+        pos += 1
+
+    def cut_off(e): #the error may be the chunk boundary: an open string, or a short tail (number, literal, escape) at the end of buf
+        return e.msg.startswith("Unterminated string") or len(buf) - e.pos <= TRUNCATED_TAIL
+
+    def value(): #decode one JSON value, extending the buffer until it is complete
+        nonlocal buf, pos, base
+        peek()
+        while True:
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                if not cut_off(e) or not extend(): #a real syntax error, or the document ends inside the value
+                    e.pos += base #offset into the whole document; line and column are unknown while streaming
+                    e.lineno = e.colno = None
+                    e.args = (f"{e.msg}: char {e.pos} of scene document",)
+                    raise
+                continue
+            if end == len(buf) and extend(): #a number that may continue in the next chunk
+                continue
+            pos = end
+            if pos > chunk_size: #drop consumed text so the buffer stays around one chunk
+                base += pos
+                buf, pos = buf[pos:], 0
+            return obj
+
+    def extend(): #append the next chunk to the unconsumed text; False at the end of the file
+        nonlocal buf, pos, base
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return False
+        base += pos
+        buf, pos = buf[pos:] + chunk, 0
+        return True
+
+    expect("{")
+    if peek() == "}":
+        return
+    while True:
+        key = value()
+        expect(":")
+        if key == "vertex-data" and peek() == "[":
+            expect("[")
+            while peek() != "]":
+                yield key, value()
+                if peek() == ",":
+                    pos += 1
+            pos += 1
+        else:
+            yield key, value()
+        if peek() != ",":
+            break
+        pos += 1
+    expect("}")
+
+def region_id(item): #region ids are ints in kind lists; digit strings are accepted and normalised to int
+    if isinstance(item, int):
+        return item
+    if isinstance(item, str) and item.isdigit():
+        return int(item)
+    return None
+
+def parse_kind_list(kind_list): #split a kind list once into (neighbor ids, region ids), dropping the repeated first neighbor
+    neighbors, regions = [], []
+    for item in kind_list:
+        region = region_id(item)
+        if region is not None:
+            regions.append(region)
+        elif isinstance(item, str):
+            neighbors.append(item)
+    if len(neighbors) > 1 and neighbors[0] == neighbors[-1]:
+        neighbors.pop()
+    return neighbors, regions
 
 class SceneUnderstander:
-    def __init__(self):
-        self.vertices = {}
+    QUIET, INFO, TRACE = 0, 1, 2 #trace levels: silent, stage headers and bodies, every vertex/link/merge
+    CACHE_VERSION = 1 #part of every scene_key; bump when a change to the analysis alters its results
+    DOCUMENT_STATS = ("load_file", "detect_background", "detect_flip", "flip_votes_upright", "flip_votes_flipped") #recorded once per loaded document, kept across re-analysis
+
+    def __init__(self, trace_level=QUIET, variant="final", classifier=None, linker=None, grouper=None, background_method="frequency", type_cache_size=0, type_quantum=0.5): #strategy names override the variant's; type_cache_size > 0 memoizes junction types
+        self.trace_level = trace_level
+        self.background_method = background_method #how loaders pick a background the document does not name: "frequency", "hull" or None
+        self.background_source = None #"file" or the detection method that chose self.background
+        default_classifier, default_linker, default_grouper = VARIANTS[variant]
+        self.variant = variant
+        classifier = CLASSIFIERS[classifier or default_classifier]
+        self.classifier = classifier(TypeCache(classifier.thresholds, type_quantum, type_cache_size) if type_cache_size else None)
+        self.linker = LINKERS[linker or default_linker]()
+        self.grouper = GROUPERS[grouper or default_grouper]()
+        self.vertices = self.VertexTable()
         self.file_info = {}
+        self.pending = set() #ids loaded into file_info since create_vertices last ran
         self.background = None
-        self.all_links = []
+        self.link_table = self.LinkTable()
         self.nuclei = []
+        self.global_nuclei = [] #region lists after global grouping, before singlebody
+        self.needs_flip = False
+        self.detected_flip = None #needs_flip found by detect_needs_flip, once per loaded scene
+        self.result = None
+        self.incremental = None #region indexes for edits, built on the first edit
+        self.cache_hit = False #analyze_scene took its result from a cache and skipped the pipeline
+        self.analyzed = False #analyze_scene ran on the loaded document, so edits must keep its result current
+        self.spatial = None #SpatialIndex over vertex coords, built by the first spatial query
+        self.region_bodies = None #region -> final body (sorted region list), built by the first body lookup
+        self.graph = None #RegionGraph, built by the first region_graph call
+        self.stats = self.SceneStats()
         
     def load_file(self, file_name):
-        try:
+        with self.stats.timed("load_file"):
+            try:
+                with open(file_name, "r") as file:
+                    data = json.load(file)  # load the JSON file
+                    self.load_data(data)
+                if self.trace_level >= self.INFO:
+                    print(f"Loaded {len(self.file_info)} vertices from {file_name}")
+            except FileNotFoundError:
+                print("Error: The file '", file_name, "' was not found.")
+            except Exception as e:
+                print("An error occurred: ", e)
+
+    def load_data(self, data): #take an already parsed scene document (same schema as the JSON files)
+        self.background = data.get("background")
+        if region_id(self.background) is not None:
+            self.background = region_id(self.background)
+        for vert in data["vertex-data"]:  # iterate over vertices
+            self.file_info[vert['id']] = {
+                "coords": vert['coords'], 
+                "kind_list": vert['kind-list']
+            }
+            self.pending.add(vert['id'])
+        self.resolve_background()
+
+    def resolve_background(self): #called by every loader: keep the document's background or detect one once, for all later stages
+        self.detected_flip = None #a new document: its orientation is detected again when asked for
+        self.spatial = None #and its spatial index rebuilt
+        self.analyzed = False
+        if self.background is not None:
+            self.background_source = "file"
+        elif self.background_method:
+            with self.stats.timed("detect_background"):
+                self.background = self.detect_background(self.background_method)
+            self.background_source = self.background_method
+            if self.trace_level >= self.INFO:
+                print(f"Detected background region {self.background} ({self.background_method})")
+
+    def region_array(self, rows=None): #regions of the given rows (default: every vertex, in load order) as one flat sequence
+        table = self.vertices
+        np = numpy_for(len(table.order))
+        if np is None:
+            rows = table.order if rows is None else rows
+            return [r for row in rows for r in table.regions[table.region_start[row]:table.region_start[row] + table.region_count[row]]]
+        rows = np.frombuffer(table.order, dtype=np.int64) if rows is None else np.asarray(rows, dtype=np.int64)
+        starts = np.frombuffer(table.region_start, dtype=np.int64)[rows]
+        counts = np.frombuffer(table.region_count, dtype=np.int32)[rows].astype(np.int64)
+        slots = np.arange(counts.sum()) + np.repeat(starts - (np.cumsum(counts) - counts), counts) #CSR slices -> flat indices
+        return np.frombuffer(table.regions, dtype=np.int64)[slots]
+
+    def detect_background(self, method="frequency"): #most frequent region, or the region shared by most convex hull vertices
+        self.create_vertices()
+        rows = None
+        if method == "hull":
+            rows = self.hull_rows()
+        elif method != "frequency":
+            raise ValueError(f"unknown background detection method {method!r}")
+        regions = self.region_array(rows)
+        if not len(regions):
+            return None
+        if isinstance(regions, list): #region_array took the pure-Python path
+            counts = {}
+            for r in regions: #ties go to the region seen first
+                counts[r] = counts.get(r, 0) + 1
+            return max(counts, key=counts.get)
+        np = numpy_for()
+        low = int(regions.min())
+        if low >= 0 and int(regions.max()) <= 4 * len(regions): #dense small ids: one bincount instead of a sort
+            counts = np.bincount(regions)
+            values = np.flatnonzero(counts == counts.max())
+            first = [int(np.argmax(regions == v)) for v in values] if len(values) > 1 else [0]
+        else:
+            values, first, counts = np.unique(regions, return_index=True, return_counts=True)
+            values, first = values[counts == counts.max()], first[counts == counts.max()]
+        return int(values[np.argmin(first)]) #ties go to the region seen first
+
+    def detect_needs_flip(self): #y orientation by majority vote of the 3-junctions: their wedge angles sum to 360 when the kind lists wind counterclockwise, 720 otherwise
+        self.create_vertices()
+        table = self.vertices
+        np = numpy_for(len(table.order))
+        if np is None:
+            upright = flipped = 0
+            for row in table.order:
+                start = table.neighbor_start[row]
+                neighbor_rows = table.neighbors[start:start + table.neighbor_count[row]]
+                if len(neighbor_rows) != 3 or not all(table.defined[n] for n in neighbor_rows):
+                    continue
+                theta = [math.atan2(table.ys[n] - table.ys[row], table.xs[n] - table.xs[row]) for n in neighbor_rows]
+                total = sum((theta[(i + 1) % 3] - theta[i]) % (2 * math.pi) for i in range(3))
+                if total < 3 * math.pi:
+                    upright += 1
+                else:
+                    flipped += 1
+        else:
+            rows = np.frombuffer(table.order, dtype=np.int64)
+            counts = np.frombuffer(table.neighbor_count, dtype=np.int32)
+            rows = rows[counts[rows] == 3]
+            neighbor_rows = np.frombuffer(table.neighbors, dtype=np.int64)[np.frombuffer(table.neighbor_start, dtype=np.int64)[rows][:, None] + np.arange(3)]
+            complete = np.frombuffer(table.defined, dtype=np.uint8)[neighbor_rows].all(axis=1)
+            rows, neighbor_rows = rows[complete], neighbor_rows[complete]
+            xs, ys = np.frombuffer(table.xs), np.frombuffer(table.ys)
+            theta = np.arctan2(ys[neighbor_rows] - ys[rows][:, None], xs[neighbor_rows] - xs[rows][:, None]) #votes only need the winding, not exact angles
+            total = ((np.roll(theta, -1, axis=1) - theta) % (2 * np.pi)).sum(axis=1)
+            upright = int((total < 3 * np.pi).sum())
+            flipped = len(total) - upright
+        self.stats.add("flip_votes_upright", upright)
+        self.stats.add("flip_votes_flipped", flipped)
+        if self.trace_level >= self.INFO:
+            print(f"Detected needs_flip={flipped > upright} ({upright} upright, {flipped} flipped 3-junctions)")
+        return flipped > upright #ties and scenes without 3-junctions keep the y axis pointing up
+
+    def hull_rows(self): #rows of the vertices on the convex hull of all coords (monotone chain)
+        table = self.vertices
+        rows = list(table.order)
+        np = numpy_for(len(rows))
+        if np is not None and len(rows) > 8: #drop points strictly inside the quadrilateral of the diagonal extremes first
+            r = np.frombuffer(table.order, dtype=np.int64)
+            xs, ys = np.frombuffer(table.xs)[r], np.frombuffer(table.ys)[r]
+            corners = [int(i) for i in (np.argmin(xs + ys), np.argmax(xs - ys), np.argmax(xs + ys), np.argmin(xs - ys))] #counterclockwise
+            inside = np.ones(len(r), dtype=bool)
+            for i in range(4):
+                a, b = corners[i], corners[(i + 1) % 4]
+                inside &= (xs[b] - xs[a]) * (ys - ys[a]) - (ys[b] - ys[a]) * (xs - xs[a]) > 0
+            rows = r[~inside].tolist()
+        points = sorted((table.xs[row], table.ys[row], row) for row in rows)
+
+        def cross(o, a, b):
+            return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+        hull = []
+        for chain in (points, points[::-1]): #lower hull, then upper hull
+            part = []
+            for p in chain:
+                while len(part) >= 2 and cross(part[-2], part[-1], p) <= 0:
+                    part.pop()
+                part.append(p)
+            hull.extend(part[:-1])
+        return [p[2] for p in hull] or [p[2] for p in points]
+
+    def load_file_streaming(self, file_name): #like load_file, but builds vertices while parsing without keeping the document; raises on unreadable or malformed files
+        with self.stats.timed("load_file"):
             with open(file_name, "r") as file:
-                data = json.load(file)  # load the JSON file
-                self.background = data.get("background")
-                for vert in data["vertex-data"]:  # iterate over vertices
-                    self.file_info[vert['id']] = {
-                        "coords": vert['coords'], 
-                        "kind_list": vert['kind-list']
-                    }
-            print(f"Loaded {len(self.file_info)} vertices from {file_name}")
-        except FileNotFoundError:
-            print("Error: The file '", file_name, "' was not found.")
-        except Exception as e:
-            print("An error occurred: ", e)
-
-    class Vertex:
-        def __init__(self, vertex_id, coords, kind_list):
-            self.id = vertex_id
-            self.coords = coords  # (x, y)
-            self.kind_list = kind_list
-            self.vertex_type = None
-            self.angles = []  # store calculated angles
-            self.neigboring_vertices = []  # connected vertices
-        
+                count = 0
+                for key, value in iter_scene_document(file):
+                    if key == "vertex-data":
+                        self.vertices.add(value['id'], value['coords'], value['kind-list'])
+                        count += 1
+                    elif key == "background": #may come before or after the vertices
+                        self.background = value if region_id(value) is None else region_id(value)
+                self.resolve_background()
+            if self.trace_level >= self.INFO:
+                print(f"Loaded {count} vertices from {file_name}")
+
+    def load_binary(self, file_name): #load a file written by save_binary through a memory map, without per-vertex parsing; raises on unreadable or malformed files
+        import mmap
+        with self.stats.timed("load_file"):
+            with open(file_name, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                self.vertices, self.background = self.VertexTable.from_binary(buffer)
+            self.resolve_background()
+            if self.trace_level >= self.INFO:
+                print(f"Loaded {len(self.vertices)} vertices from {file_name}")
+
+    def save_binary(self, file_name): #write the loaded scene in the binary columnar format
+        self.create_vertices()
+        with open(file_name, "wb") as file:
+            self.vertices.write_binary(file, self.background)
+
+    class SceneStats: #wall time per stage and work counters, one instance per scene
+        def __init__(self):
+            self.timings = {} #stage -> seconds
+            self.counters = {}
+
+        @contextlib.contextmanager
+        def timed(self, stage):
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                self.timings[stage] = self.timings.get(stage, 0.0) + time.perf_counter() - start
+
+        def add(self, counter, amount=1):
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+        def reset(self, keep=()): #drop timings and counters, except the stages/counters named in keep
+            self.timings = {stage: seconds for stage, seconds in self.timings.items() if stage in keep}
+            self.counters = {counter: count for counter, count in self.counters.items() if counter in keep}
+
+        def __repr__(self):
+            return f"SceneStats(timings={self.timings}, counters={self.counters})"
+
+        def to_dict(self):
+            return {"timings": dict(self.timings), "counters": dict(self.counters)}
+
+        def to_json(self, indent=None):
+            return json.dumps(self.to_dict(), indent=indent)
+
+        def dump(self, file_name):
+            with open(file_name, "w") as file:
+                file.write(self.to_json(indent=2))
+
+    class LinkTable: #deduplicated region links: canonical pair -> multiplicity and the vertices that produced it
+        def __init__(self):
+            self.counts = {} #(r1, r2) with r1 <= r2 -> number of links, in order of first appearance
+            self.sources = {} #(r1, r2) -> ids of the vertices that produced it, one entry per link
+            self.vertex_links = {} #vertex id -> links as its linker produced them
+            self.adjacency = None #region -> {other region: count} without self links; built by region_adjacency, then kept up to date
+
+        def add(self, vertex_id, links): #record the links of one vertex (remove its old ones first)
+            if not links:
+                return
+            self.vertex_links[vertex_id] = links
+            counts, sources, adjacency = self.counts, self.sources, self.adjacency
+            for r1, r2 in links:
+                pair = (r1, r2) if r1 <= r2 else (r2, r1)
+                count = counts[pair] = counts.get(pair, 0) + 1
+                if count == 1:
+                    sources[pair] = [vertex_id]
+                else:
+                    sources[pair].append(vertex_id)
+                if adjacency is not None and r1 != r2:
+                    adjacency.setdefault(r1, {})[r2] = adjacency.setdefault(r2, {})[r1] = count
+
+        def remove(self, vertex_id): #forget the links of one vertex; returns them
+            links = self.vertex_links.pop(vertex_id, [])
+            adjacency = self.adjacency
+            for r1, r2 in links:
+                pair = (r1, r2) if r1 <= r2 else (r2, r1)
+                count = self.counts[pair] - 1
+                if count:
+                    self.counts[pair] = count
+                    self.sources[pair].remove(vertex_id)
+                else:
+                    del self.counts[pair], self.sources[pair]
+                if adjacency is None or r1 == r2:
+                    continue
+                if count:
+                    adjacency[r1][r2] = adjacency[r2][r1] = count
+                    continue
+                for a, b in ((r1, r2), (r2, r1)):
+                    del adjacency[a][b]
+                    if not adjacency[a]:
+                        del adjacency[a]
+            return links
+
+        def region_adjacency(self):
+            if self.adjacency is None:
+                self.adjacency = {}
+                for (r1, r2), count in self.counts.items():
+                    if r1 != r2:
+                        self.adjacency.setdefault(r1, {})[r2] = self.adjacency.setdefault(r2, {})[r1] = count
+            return self.adjacency
+
+        def merge(self, other): #append the links of a table built over later vertices
+            for pair, count in other.counts.items():
+                if pair in self.counts:
+                    self.counts[pair] += count
+                    self.sources[pair].extend(other.sources[pair])
+                else:
+                    self.counts[pair] = count
+                    self.sources[pair] = other.sources[pair]
+            self.vertex_links.update(other.vertex_links)
+            self.adjacency = None
+
+        def __len__(self): #distinct pairs
+            return len(self.counts)
+
+        def total(self): #links including duplicates
+            return sum(self.counts.values())
+
+        def links(self): #every link with duplicates, in production order
+            return [link for links in self.vertex_links.values() for link in links]
+
+        def counts_without(self, region): #pair counts for grouping, leaving out the pairs that touch region (the background)
+            return {pair: count for pair, count in self.counts.items() if region not in pair}
+
+        def __repr__(self):
+            return f"LinkTable(pairs={len(self.counts)}, links={self.total()})"
+
+        def to_dict(self, vertices=None): #audit rows per pair; with the vertex table, also the type of each producing vertex
+            rows = []
+            for pair in sorted(self.counts):
+                row = {"regions": list(pair), "count": self.counts[pair], "vertices": list(self.sources[pair])}
+                if vertices is not None:
+                    row["types"] = [vertices[vid].vertex_type if vid in vertices else None for vid in self.sources[pair]]
+                rows.append(row)
+            return {"links": rows}
+
+        def to_json(self, vertices=None, indent=None):
+            return json.dumps(self.to_dict(vertices), indent=indent)
+
+        def dump(self, file_name, vertices=None):
+            with open(file_name, "w") as file:
+                file.write(self.to_json(vertices, indent=2))
+
+    class VertexTable(Mapping): #columnar store of all vertices, read through lightweight Vertex views
+        TYPES = (None, "L", "T", "ARROW", "FORK") #vertex_type stored as a one-byte code
+
+        def __init__(self):
+            self.ids = [] #row -> interned vertex id
+            self.row_of = {} #vertex id -> row, None until first needed for tables read from a binary file
+            self.order = array("q") #rows of defined vertices, in load order
+            self.defined = bytearray() #1 once a row has coords (rows can be referenced before they are loaded)
+            self.xs = array("d")
+            self.ys = array("d")
+            self.neighbor_start = array("q") #CSR-style slice of neighbors/angles for each row
+            self.neighbor_count = array("i")
+            self.neighbors = array("q") #neighbor rows in kind-list order, cyclic duplicate removed
+            self.angles = array("d") #calculated angles, stored in the vertex's neighbor slots
+            self.directions = array("d") #edge table: angle of the edge to each neighbor slot, filled by SceneUnderstander.compute_directions
+            self.angle_count = bytearray()
+            self.region_start = array("q") #CSR-style slice of regions for each row
+            self.region_count = array("i")
+            self.regions = array("q") #region ids in kind-list order
+            self.types = bytearray()
+
+        @property
+        def index(self): #vertex id -> row
+            if self.row_of is None:
+                self.row_of = dict(zip(self.ids, range(len(self.ids))))
+            return self.row_of
+
+        def intern(self, vertex_id): #row for vertex_id, reserving one if it has not been seen yet
+            row = self.index.get(vertex_id)
+            if row is None:
+                row = len(self.ids)
+                self.ids.append(sys.intern(vertex_id))
+                self.index[vertex_id] = row
+                self.defined.append(0)
+                for column in (self.xs, self.ys, self.neighbor_start, self.neighbor_count, self.region_start, self.region_count):
+                    column.append(0)
+                self.angle_count.append(0)
+                self.types.append(0)
+            return row
+
+        def add(self, vertex_id, coords, kind_list): #define (or redefine) a vertex
+            row = self.intern(vertex_id)
+            if not self.defined[row]:
+                self.defined[row] = 1
+                self.order.append(row)
+            self.xs[row], self.ys[row] = coords
+            self.set_kind_list(row, kind_list)
+            return SceneUnderstander.Vertex(self, row)
+
+        def set_kind_list(self, row, kind_list): #split the kind list into neighbor rows and region ids
+            neighbors, regions = parse_kind_list(kind_list)
+            neighbors = [self.intern(n) for n in neighbors]
+            if len(neighbors) > self.neighbor_count[row]: #reuse the old slice when the new one fits
+                self.neighbor_start[row] = len(self.neighbors)
+                self.neighbors.extend([0] * len(neighbors))
+                self.angles.extend([0.0] * len(neighbors))
+                self.directions.extend([0.0] * len(neighbors))
+            start = self.neighbor_start[row]
+            self.neighbors[start:start + len(neighbors)] = array("q", neighbors)
+            self.neighbor_count[row] = len(neighbors)
+            if len(regions) > self.region_count[row]:
+                self.region_start[row] = len(self.regions)
+                self.regions.extend([0] * len(regions))
+            start = self.region_start[row]
+            self.regions[start:start + len(regions)] = array("q", regions)
+            self.region_count[row] = len(regions)
+            self.types[row] = 0
+            self.angle_count[row] = 0
+
+        def remove(self, vertex_id): #undefine a vertex; its row stays reserved for kind lists that still mention it
+            row = self.index[vertex_id]
+            if self.defined[row]:
+                self.defined[row] = 0
+                self.order.remove(row)
+                self.neighbor_count[row] = 0
+                self.region_count[row] = 0
+                self.types[row] = 0
+                self.angle_count[row] = 0
+
+        def __getitem__(self, vertex_id):
+            row = self.index.get(vertex_id)
+            if row is None or not self.defined[row]:
+                raise KeyError(vertex_id)
+            return SceneUnderstander.Vertex(self, row)
+
+        def __iter__(self):
+            for row in self.order:
+                yield self.ids[row]
+
+        def __len__(self):
+            return len(self.order)
+
+        def values(self):
+            for row in self.order:
+                yield SceneUnderstander.Vertex(self, row)
+
+        def items(self):
+            for row in self.order:
+                yield self.ids[row], SceneUnderstander.Vertex(self, row)
+
+        BINARY_MAGIC = b"SCNB"
+        BINARY_VERSION = 1
+        BINARY_COLUMNS = ("order", "xs", "ys", "neighbor_start", "neighbor_count", "neighbors", "region_start", "region_count", "regions") #file order
+        BINARY_HEADER = struct.Struct("<4sHHqqqqqq") #magic, version, unused, rows, defined rows, neighbor slots, region slots, id bytes, background bytes
+
+        def binary_columns(self, rows, defined, neighbor_slots, region_slots): #(array, length) in file order, after the header and background
+            lengths = (defined, rows, rows, rows, rows, neighbor_slots, rows, rows, region_slots)
+            return [(getattr(self, name), length) for name, length in zip(self.BINARY_COLUMNS, lengths)]
+
+        def write_binary(self, file, background=None): #little-endian columns, each padded to 8 bytes, then defined flags and a NUL-separated id table
+            if not all(isinstance(i, str) and "\0" not in i for i in self.ids):
+                raise ValueError("binary scenes need string vertex ids without NUL characters")
+            id_bytes = "\0".join(self.ids).encode()
+            background_bytes = json.dumps(background).encode()
+            header = (len(self.ids), len(self.order), len(self.neighbors), len(self.regions), len(id_bytes), len(background_bytes))
+            file.write(self.BINARY_HEADER.pack(self.BINARY_MAGIC, self.BINARY_VERSION, 0, *header))
+            chunks = [background_bytes]
+            for column, _ in self.binary_columns(*header[:4]):
+                if sys.byteorder == "big":
+                    column = array(column.typecode, column)
+                    column.byteswap()
+                chunks.append(column.tobytes())
+            chunks += [bytes(self.defined), id_bytes]
+            for chunk in chunks:
+                file.write(chunk)
+                file.write(bytes(-len(chunk) % 8))
+
+        @classmethod
+        def binary_sections(cls, view): #(counts from the header, background, column views in binary_columns order, defined flags, id table) of write_binary output
+            magic, version, _, rows, defined, neighbor_slots, region_slots, id_size, background_size = cls.BINARY_HEADER.unpack_from(view)
+            if magic != cls.BINARY_MAGIC:
+                raise ValueError("not a binary scene file")
+            if version != cls.BINARY_VERSION:
+                raise ValueError(f"unsupported binary scene version {version}")
+            offset = cls.BINARY_HEADER.size
+
+            def take(size): #next section of the file, skipping its padding
+                nonlocal offset
+                if offset + size > len(view):
+                    raise ValueError("truncated binary scene file")
+                start = offset
+                offset += size + (-size % 8)
+                return view[start:start + size]
+
+            background = json.loads(bytes(take(background_size)))
+            columns = [take(length * column.itemsize) for column, length in cls().binary_columns(rows, defined, neighbor_slots, region_slots)]
+            return (rows, defined, neighbor_slots, region_slots), background, columns, take(rows), take(id_size)
+
+        @classmethod
+        def from_binary(cls, buffer): #(table, background) from write_binary output; columns are copied out of the buffer in bulk
+            table = cls()
+            view = memoryview(buffer)
+            try:
+                counts, background, sections, defined, id_bytes = cls.binary_sections(view)
+                for (column, _), section in zip(table.binary_columns(*counts), sections):
+                    column.frombytes(section)
+                    if sys.byteorder == "big":
+                        column.byteswap()
+                table.defined = bytearray(defined)
+                table.ids = bytes(id_bytes).decode().split("\0") if counts[0] else []
+            finally:
+                view.release()
+            neighbor_slots, rows = counts[2], counts[0]
+            table.row_of = None #hashing every id is most of the load time, so the index waits for the first lookup
+            table.angles = array("d", bytes(8 * neighbor_slots))
+            table.directions = array("d", bytes(8 * neighbor_slots))
+            table.angle_count = bytearray(rows)
+            table.types = bytearray(rows)
+            return table, background
+
+        @classmethod
+        def view_binary(cls, view, id_offsets, types, angle_count, angles, directions): #(table, background) over little-endian write_binary output without copying it: every column is a view into view, results go to the given views
+            table = cls()
+            counts, background, sections, defined, id_bytes = cls.binary_sections(view)
+            for name, section in zip(cls.BINARY_COLUMNS, sections):
+                setattr(table, name, section.cast(getattr(table, name).typecode))
+            table.defined = defined
+            table.ids = cls.IdView(id_bytes, id_offsets)
+            table.row_of = None
+            table.types, table.angle_count, table.angles, table.directions = types, angle_count, angles, directions
+            return table, background
+
+        class IdView: #vertex ids decoded on demand from a NUL-separated id table; offsets: start of each row's id, then the table's length + 1
+            def __init__(self, id_bytes, offsets):
+                self.id_bytes = id_bytes
+                self.offsets = offsets
+
+            def __getitem__(self, row):
+                if not 0 <= row < len(self.offsets) - 1:
+                    raise IndexError(row)
+                return str(self.id_bytes[self.offsets[row]:self.offsets[row + 1] - 1], "utf-8")
+
+            def __len__(self):
+                return len(self.offsets) - 1
+
+    class Vertex: #view of one VertexTable row
+        __slots__ = ("table", "row")
+
+        def __init__(self, table, row):
+            self.table = table
+            self.row = row
+
+        @property
+        def id(self):
+            return self.table.ids[self.row]
+
+        @property
+        def coords(self): # (x, y)
+            return (self.table.xs[self.row], self.table.ys[self.row])
+
+        @property
+        def neighbors(self): #neighboring vertex ids in kind-list order
+            t, start = self.table, self.table.neighbor_start[self.row]
+            return [t.ids[n] for n in t.neighbors[start:start + t.neighbor_count[self.row]]]
+
+        @property
+        def regions(self): #region ids in kind-list order
+            start = self.table.region_start[self.row]
+            return self.table.regions[start:start + self.table.region_count[self.row]].tolist()
+
+        @property
+        def kind_list(self): #rebuilt as neighbor, region, ..., first neighbor again
+            neighbors, regions = self.neighbors, self.regions
+            kind_list = []
+            for i in range(max(len(neighbors), len(regions))):
+                kind_list.extend(neighbors[i:i + 1] + regions[i:i + 1])
+            return kind_list + neighbors[:1]
+
+        @property
+        def vertex_type(self):
+            return self.table.TYPES[self.table.types[self.row]]
+
+        @vertex_type.setter
+        def vertex_type(self, vertex_type):
+            self.table.types[self.row] = self.table.TYPES.index(vertex_type)
+
+        @property
+        def angles(self): # calculated angles
+            start = self.table.neighbor_start[self.row]
+            return self.table.angles[start:start + self.table.angle_count[self.row]].tolist()
+
+        @angles.setter
+        def angles(self, angles):
+            if len(angles) > max(self.table.neighbor_count[self.row], 1):
+                raise ValueError(f"vertex {self.id} has room for {self.table.neighbor_count[self.row]} angles, got {len(angles)}")
+            start = self.table.neighbor_start[self.row]
+            self.table.angles[start:start + len(angles)] = array("d", angles)
+            self.table.angle_count[self.row] = len(angles)
+
         def get_vector(self, v_coords,needs_flip):
             x = v_coords[0] - self.coords[0]
             y = (v_coords[1] - self.coords[1])
             if(needs_flip):
-                y = -(v_coords[1] - self.coords[1])
+                y = self.coords[1] - v_coords[1] #negated without producing -0.0
             return x,y
         
         def calculate_angle(self, v1_coords, v2_coords,needs_flip): #calculate angles of vertex
@@ -52,52 +719,67 @@ class SceneUnderstander:
             angle_degrees = math.degrees(angle_diff) #convert to degrees
             return angle_degrees
             
-        def calculate_vertex_type(self, vertices_dict, needs_flip): #determine type of vertex based on angles
-            neighbors = []
-            for i in range(len(self.kind_list)):
-                if isinstance(self.kind_list[i], str):
-                    neighbors.append(self.kind_list[i]) # list neighboring vertices
-            if neighbors[0] == neighbors[-1]:
-                neighbors = neighbors[:-1]
+        def wedge_angle(self, i, j): #ccw angle in degrees from the edge to neighbor slot i to the edge to slot j, read from the edge table
+            table = self.table
+            start = table.neighbor_start[self.row]
+            for slot in (start + i, start + j):
+                if not table.defined[table.neighbors[slot]]:
+                    raise KeyError(table.ids[table.neighbors[slot]])
+            angle_diff = table.directions[start + j] - table.directions[start + i] #same arithmetic as calculate_angle
+            if angle_diff < 0:
+                angle_diff += 2 * math.pi
+            return math.degrees(angle_diff)
+
+        @staticmethod
+        def junction_type(angles): #type of a 3-junction from its wedge angles
+            if any(abs(a - 180) < 5 for a in angles):
+                return "T"
+            elif any(a > 180 for a in angles):
+                return "ARROW"
+            return "FORK"
+
+        def calculate_vertex_type(self, vertices_dict, needs_flip, trace=False, type_cache=None): #determine type of vertex based on angles (edge table must be current for needs_flip)
+            neighbors = self.neighbors
+            self.vertex_type = None
+            self.angles = []
             neighbor_count = len(neighbors)
-            print("-----CLASSIFYING VERTEX TYPE of Vertex" ,self.id,"-----")
+            if trace:
+                print("-----CLASSIFYING VERTEX TYPE of Vertex" ,self.id,"-----")
             if neighbor_count == 2: ##if only 2 edges
                 self.vertex_type = "L"
                 v1 = neighbors[0]
                 v2 = neighbors[1]
-                v1_coords = vertices_dict[v1].coords
-                v2_coords = vertices_dict[v2].coords
-                angle = self.calculate_angle(v1_coords, v2_coords,needs_flip)
+                angle = self.wedge_angle(0, 1)
                 self.angles = [angle]
-                print(f"  Angle from {v1} to {v2}: {angle:.2f}")
-                print(f"  Vertex Type: L (two lines)")
+                if trace:
+                    print(f"  Angle from {v1} to {v2}: {angle:.2f}")
+                    print(f"  Vertex Type: L (two lines)")
                 return
             elif neighbor_count == 3:
                 angles = []
                 for i in range(3):
                     v1 = neighbors[i]
                     v2 = neighbors[(i + 1) % 3]
-                    v1_coords = vertices_dict[v1].coords
-                    v2_coords = vertices_dict[v2].coords
-                    angle = self.calculate_angle(v1_coords, v2_coords, needs_flip) 
+                    angle = self.wedge_angle(i, (i + 1) % 3)
                     angles.append(angle)
-                    print(f"  Angle from {v1} to {v2}: {angle:.2f}")
+                    if trace:
+                        print(f"  Angle from {v1} to {v2}: {angle:.2f}")
                 self.angles = angles
-                if any(abs(a - 180) < 5 for a in angles):
-                    self.vertex_type = "T"
-                elif any(a > 180 for a in angles):
-                    self.vertex_type = "ARROW"
+                if type_cache is not None:
+                    self.vertex_type = type_cache.classify(angles, self.junction_type)
                 else:
-                    self.vertex_type = "FORK"
-            print("The vertex", self.id, "is of type", self.vertex_type)
+                    self.vertex_type = self.junction_type(angles)
+            if trace:
+                print("The vertex", self.id, "is of type", self.vertex_type)
             return
 
-        def region_linking(self,  background): #make links between regions based on vertex types
+        def region_linking(self,  background, trace=False): #make links between regions based on vertex types
             links = []
-            regions_all = [r for r in self.kind_list if isinstance(r, int) or (isinstance(r, str) and r.isdigit())]
+            regions_all = self.regions
             regions_no_background = [r for r in regions_all if r != background]
             vert_type = self.vertex_type
-            print(f"Vertex {self.id}: regions_all={regions_all}, type={vert_type}")
+            if trace:
+                print(f"Vertex {self.id}: regions_all={regions_all}, type={vert_type}")
             if vert_type in ("L", "T") or len(regions_no_background) < 2:
                 return links
             if vert_type == "FORK": #generate three links for each pair of regions
@@ -105,7 +787,8 @@ class SceneUnderstander:
                     for j in range(i + 1, len(regions_no_background)):
                         link = tuple(sorted([regions_no_background[i], regions_no_background[j]]))
                         links.append(link) 
-                        print(f"[LINK] FORK at {self.id}: {link}")
+                        if trace:
+                            print(f"[LINK] FORK at {self.id}: {link}")
             elif vert_type == "ARROW": #generate one link between smaller angle regions
                 if len(self.angles) >= 3 and len(regions_no_background) >= 2:
                     max_angle = self.angles.index(max(self.angles)) #get index of max value
@@ -119,23 +802,266 @@ class SceneUnderstander:
                         return links
                     link = tuple(sorted([r1, r2]))
                     links.append(link)
-                    print(f"[LINK] ARROW at {self.id}: {link}")
+                    if trace:
+                        print(f"[LINK] ARROW at {self.id}: {link}")
             return links
         
-    def create_vertices(self):
+    class SpatialIndex: #uniform grid over vertex coords (file coordinates, never flipped)
+        def __init__(self, table, cell_size=None):
+            self.table = table
+            if cell_size is None: #about one vertex per cell over the bounding box
+                xs = [table.xs[row] for row in table.order] or [0.0]
+                ys = [table.ys[row] for row in table.order] or [0.0]
+                area = (max(xs) - min(xs)) * (max(ys) - min(ys))
+                cell_size = math.sqrt(area / len(xs)) or 1.0
+            self.cell_size = cell_size
+            self.cells = {} #(cx, cy) -> rows
+            self.cell_of = {} #row -> (cx, cy)
+            self.bounds = None #(min cx, min cy, max cx, max cy) ever occupied, limits nearest's search
+            for row in table.order:
+                self.insert(row)
+
+        def cell(self, x, y):
+            return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+        def insert(self, row):
+            key = self.cell(self.table.xs[row], self.table.ys[row])
+            self.cells.setdefault(key, []).append(row)
+            self.cell_of[row] = key
+            if self.bounds is None:
+                self.bounds = key + key
+            else:
+                self.bounds = (min(self.bounds[0], key[0]), min(self.bounds[1], key[1]), max(self.bounds[2], key[0]), max(self.bounds[3], key[1]))
+
+        def update(self, row): #re-file a row after its vertex was added, moved or removed
+            key = self.cell_of.pop(row, None)
+            if key is not None:
+                self.cells[key].remove(row)
+                if not self.cells[key]:
+                    del self.cells[key]
+            if self.table.defined[row]:
+                self.insert(row)
+
+        def box(self, x0, y0, x1, y1): #rows inside the box, borders included, in row order
+            (cx0, cy0), (cx1, cy1) = self.cell(min(x0, x1), min(y0, y1)), self.cell(max(x0, x1), max(y0, y1))
+            xs, ys = self.table.xs, self.table.ys
+            rows = []
+            if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self.cells): #box larger than the occupied grid, scan occupied cells instead
+                keys = [key for key in self.cells if cx0 <= key[0] <= cx1 and cy0 <= key[1] <= cy1]
+            else:
+                keys = [(cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1)]
+            for key in keys:
+                for row in self.cells.get(key, ()):
+                    if min(x0, x1) <= xs[row] <= max(x0, x1) and min(y0, y1) <= ys[row] <= max(y0, y1):
+                        rows.append(row)
+            return sorted(rows)
+
+        def within(self, x, y, radius): #rows at distance <= radius, nearest first
+            found = [(math.hypot(self.table.xs[row] - x, self.table.ys[row] - y), row) for row in self.box(x - radius, y - radius, x + radius, y + radius)]
+            return [row for distance, row in sorted(found, key=lambda f: f[0]) if distance <= radius]
+
+        def nearest(self, x, y, max_distance=None): #closest row, searching rings of cells outwards; None if nothing is in reach
+            if not self.cells:
+                return None
+            cx, cy = self.cell(x, y)
+            min_cx, min_cy, max_cx, max_cy = self.bounds
+            reach = max(abs(cx - min_cx), abs(cx - max_cx), abs(cy - min_cy), abs(cy - max_cy)) #ring that covers the whole grid
+            best, best_row = math.inf, None
+            for ring in range(reach + 1):
+                for key in self.ring(cx, cy, ring):
+                    for row in self.cells.get(key, ()):
+                        distance = math.hypot(self.table.xs[row] - x, self.table.ys[row] - y)
+                        if distance < best:
+                            best, best_row = distance, row
+                if best <= ring * self.cell_size: #anything in a further ring is at least this far away
+                    break
+                if max_distance is not None and ring * self.cell_size > max_distance:
+                    break
+            if max_distance is not None and best > max_distance:
+                return None
+            return best_row
+
+        def ring(self, cx, cy, ring): #cells at Chebyshev distance ring from (cx, cy)
+            if ring == 0:
+                return [(cx, cy)]
+            keys = [(cx + d, cy - ring) for d in range(-ring, ring + 1)] + [(cx + d, cy + ring) for d in range(-ring, ring + 1)]
+            return keys + [(cx - ring, cy + d) for d in range(-ring + 1, ring)] + [(cx + ring, cy + d) for d in range(-ring + 1, ring)]
+
+        def pairs_within(self, tolerance): #(row, other row) for every two vertices at distance <= tolerance, in load order
+            position = {row: i for i, row in enumerate(self.table.order)}
+            pairs = []
+            for row in self.table.order:
+                pairs.extend((position[row], position[other], row, other) for other in self.within(self.table.xs[row], self.table.ys[row], tolerance) if position[other] > position[row])
+            return [(row, other) for _, _, row, other in sorted(pairs)]
+
+    def create_vertices(self): #move vertices loaded since the last call into the table; vertices not loaded again keep edits made since
+        if not self.pending:
+            return
+        table = self.vertices
         for vid, info in self.file_info.items():
-            self.vertices[vid] = self.Vertex(vid, tuple(info["coords"]), info["kind_list"])
+            if vid in self.pending: #(re)define it from the document, in load order
+                table.add(vid, info["coords"], info["kind_list"])
+        self.pending.clear()
     
-    def analyze_vertices(self,needs_flip):
-        for v in self.vertices.values(): #calculate vertex types
-            v.calculate_vertex_type(self.vertices, needs_flip)
-        self.all_links = []
-        print("\n" + "="*50)
-        print("REGION LINKING")
-        print("="*50)
+    def compute_directions(self, needs_flip, rows=None): #edge table: one atan2 per directed edge (vertex -> neighbor slot) of the given rows (default: all)
+        table = self.vertices
+        xs, ys, neighbors, directions = table.xs, table.ys, table.neighbors, table.directions
+        np = numpy_for(len(table.order) if rows is None else 0) #edits recompute a few rows in Python
+        if np is None:
+            for row in (table.order if rows is None else rows):
+                x, y = xs[row], ys[row]
+                start = table.neighbor_start[row]
+                for slot in range(start, start + table.neighbor_count[row]):
+                    n = neighbors[slot]
+                    directions[slot] = math.atan2(y - ys[n] if needs_flip else ys[n] - y, xs[n] - x) #same vector as get_vector
+            return
+        rows = np.frombuffer(table.order, dtype=np.int64)
+        counts = np.frombuffer(table.neighbor_count, dtype=np.int32)[rows].astype(np.int64)
+        starts = np.frombuffer(table.neighbor_start, dtype=np.int64)[rows]
+        slots = np.arange(counts.sum()) + np.repeat(starts - (np.cumsum(counts) - counts), counts) #CSR slices -> flat indices
+        owners = np.repeat(rows, counts)
+        targets = np.frombuffer(neighbors, dtype=np.int64)[slots]
+        xs, ys = np.frombuffer(xs), np.frombuffer(ys)
+        dx = xs[targets] - xs[owners]
+        dy = ys[owners] - ys[targets] if needs_flip else ys[targets] - ys[owners]
+        #math.atan2 via map keeps angles bit-identical to calculate_angle (np.arctan2 can differ in the last ulp)
+        np.frombuffer(directions)[slots] = np.fromiter(map(math.atan2, dy.tolist(), dx.tolist()), float, len(slots))
+
+    def classify_vertices_vectorized(self, needs_flip): #calculate_vertex_type for every vertex in one numpy pass over the edge table
+        np = numpy_for()
+        if np is None:
+            raise ImportError("numpy is required for vectorized vertex classification")
+        table = self.vertices
+        rows = np.frombuffer(table.order, dtype=np.int64)
+        defined = np.frombuffer(table.defined, dtype=np.uint8)
+        starts = np.frombuffer(table.neighbor_start, dtype=np.int64)
+        counts = np.frombuffer(table.neighbor_count, dtype=np.int32)
+        neighbors = np.frombuffer(table.neighbors, dtype=np.int64)
+        directions = np.frombuffer(table.directions)
+        angles_out = np.frombuffer(table.angles) #writable views: results go straight back into the table
+        angle_count = np.frombuffer(table.angle_count, dtype=np.uint8)
+        types = np.frombuffer(table.types, dtype=np.uint8)
+        types[rows] = 0
+        angle_count[rows] = 0
+        for neighbor_count in (2, 3):
+            vertex_rows = rows[counts[rows] == neighbor_count]
+            if not len(vertex_rows):
+                continue
+            slots = starts[vertex_rows][:, None] + np.arange(neighbor_count)
+            neighbor_rows = neighbors[slots]
+            if not defined[neighbor_rows].all():
+                raise KeyError(table.ids[int(neighbor_rows[defined[neighbor_rows] == 0][0])])
+            theta = directions[slots]
+            if neighbor_count == 2: #L: one angle from first to second neighbor
+                diff = theta[:, 1:] - theta[:, :1]
+            else: #angle from neighbor i to neighbor i+1 (cyclic)
+                diff = np.roll(theta, -1, axis=1) - theta
+            diff = np.where(diff < 0, diff + 2 * math.pi, diff)
+            angles = np.degrees(diff)
+            if neighbor_count == 2:
+                types[vertex_rows] = table.TYPES.index("L")
+            else:
+                is_t = (np.abs(angles - 180) < 5).any(axis=1)
+                is_arrow = (angles > 180).any(axis=1)
+                types[vertex_rows] = np.where(is_t, table.TYPES.index("T"), np.where(is_arrow, table.TYPES.index("ARROW"), table.TYPES.index("FORK")))
+            angles_out[slots[:, :angles.shape[1]]] = angles
+            angle_count[vertex_rows] = angles.shape[1]
+        if self.trace_level >= self.TRACE:
+            for v in self.vertices.values():
+                print("The vertex", v.id, "is of type", v.vertex_type)
+        if self.trace_level >= self.INFO:
+            print(f"Classified {len(rows)} vertices (vectorized)")
+
+    def analyze_vertices(self,needs_flip, vectorized=False, workers=None):
+        self.needs_flip = needs_flip
+        if workers and workers > 1 and len(self.vertices) > 1 and self.trace_level < self.TRACE: #per-vertex traces need the serial order
+            try:
+                return self.analyze_vertices_parallel(needs_flip, vectorized, workers)
+            except self.UnsharedScene: #ids the binary format cannot carry: stay serial
+                pass
+        self.compute_directions(needs_flip)
+        if vectorized and self.classifier.vectorized and numpy_for() is not None: #batch mode: all vertex types in one numpy pass (without numpy, the loop below gives the same results)
+            self.classify_vertices_vectorized(needs_flip)
+        else:
+            trace = self.trace_level >= self.TRACE
+            for v in self.vertices.values(): #calculate vertex types
+                self.classifier.classify(v, self.vertices, needs_flip, trace)
+        self.link_table = self.LinkTable()
+        self.incremental = None
+        if self.trace_level >= self.INFO:
+            print("\n" + "="*50)
+            print("REGION LINKING")
+            print("="*50)
+        trace = self.trace_level >= self.TRACE
         for v in self.vertices.values(): #region linking
-            self.all_links.extend(v.region_linking(self.background))
-        print(f"All links (with duplicates): {self.all_links}")
+            self.link_table.add(v.id, self.linker.link(v, self.background, trace))
+        if trace:
+            print(f"All links (with duplicates): {self.all_links}")
+
+    class UnsharedScene(ValueError): #the scene cannot be written to shared memory for parallel analysis
+        pass
+
+    def analyze_vertices_parallel(self, needs_flip, vectorized, workers): #analyze_vertices over contiguous shards of the load order, one process per shard
+        import gc
+        import io
+        import itertools
+        import pickle
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing import shared_memory
+        if sys.byteorder == "big": #workers read the little-endian binary columns in place
+            raise self.UnsharedScene("shared scenes need a little-endian machine")
+        table = self.vertices
+        buffer = io.BytesIO()
+        try:
+            table.write_binary(buffer, self.background) #workers read the scene from shared memory in the binary format
+        except ValueError as e:
+            raise self.UnsharedScene(str(e)) from e
+        data = buffer.getbuffer()
+        input_size, rows, slots = len(data), len(table.ids), len(table.neighbors)
+        padded = rows + -rows % 8
+        id_offsets = array("q", itertools.accumulate((len(i.encode()) + 1 for i in table.ids), initial=0)) #lets workers decode single ids
+        #scene, then per-vertex results written by the workers (types, angle counts, angles), their edge table and the id offsets
+        layout = SharedLayout(input_size, rows, slots)
+        shm = shared_memory.SharedMemory(create=True, size=layout.size)
+        try:
+            shm.buf[:input_size] = data
+            data.release()
+            buffer.close()
+            shm.buf[layout.id_offsets:layout.size] = id_offsets.tobytes()
+            shards = min(workers, len(table.order))
+            bounds = [len(table.order) * i // shards for i in range(shards + 1)]
+            strategies = (self.classifier.name, self.linker.name, self.grouper.name)
+            with ProcessPoolExecutor(max_workers=shards) as pool:
+                futures = [pool.submit(analyze_shard, shm.name, layout, bounds[i], bounds[i + 1], strategies, needs_flip, vectorized) for i in range(shards)]
+                link_tables = [future.result() for future in futures] #pickled by the workers, see below
+            table.types[:] = shm.buf[layout.types:layout.types + rows]
+            table.angle_count[:] = shm.buf[layout.angle_count:layout.angle_count + rows]
+            table.angles = array("d")
+            table.angles.frombytes(shm.buf[layout.angles:layout.angles + 8 * slots])
+        finally:
+            shm.close()
+            shm.unlink()
+        self.link_table = self.LinkTable()
+        collecting = gc.isenabled()
+        gc.disable() #unpickling millions of small tuples and lists otherwise triggers collection after collection
+        try:
+            for link_table in link_tables: #shards cover the load order front to back, so merged pairs keep their serial order
+                self.link_table.merge(pickle.loads(link_table))
+        finally:
+            if collecting:
+                gc.enable()
+        self.incremental = None
+        self.stats.add("shards", shards)
+        if self.trace_level >= self.INFO:
+            print(f"Classified and linked {len(table.order)} vertices in {shards} shards")
+
+    @property
+    def all_links(self): #every link with duplicates, rebuilt from the link table
+        return self.link_table.links()
+
+    @property
+    def vertex_links(self): #vertex id -> links it produced
+        return self.link_table.vertex_links
 
     class Nucleus:
         def __init__(self, regions):
@@ -146,59 +1072,95 @@ class SceneUnderstander:
             return f"Nucleus(regions={sorted(self.regions)}, links={sorted(self.links)})"
 
     def global_grouping(self): #connects regions into nuclei based on links Links {(1,2), (2,3), (4,5)} → nuclei = [['1','2','3'], ['4','5']]
-        print("\n" + "="*50)
-        print("GLOBAL GROUPING")
-        print("="*50)
+        if self.trace_level >= self.INFO:
+            print("\n" + "="*50)
+            print("GLOBAL GROUPING")
+            print("="*50)
 
-        correct_links = [link for link in self.all_links if self.background not in link] #remove background links
-        region_ids = set(r for link in correct_links for r in link)
-        self.nuclei = [self.Nucleus([r]) for r in region_ids]#initial nuclei
-        for n in self.nuclei: #give nucleus its initial links
-            n.links = set([link for link in correct_links if link[0] in n.regions or link[1] in n.regions])
-
-        merged = True
-        while merged: # Merge until stable
-            merged = False
-            for i in range(len(self.nuclei)): #try each pair of nuclei
-                for j in range(i + 1, len(self.nuclei)):
-                    n1, n2 = self.nuclei[i], self.nuclei[j]
-                    #count links between n1 and n2
-                    connecting_links = [link for link in correct_links if (link[0] in n1.regions and link[1] in n2.regions) or (link[1] in n1.regions and link[0] in n2.regions)]
-                    if len(connecting_links) >= 2:  #make new nucleus
-                        new_regions = n1.regions.union(n2.regions)
-                        new_n = self.Nucleus(new_regions)
-                        new_n.links = n1.links.union(n2.links) #new nucleus gets all links from both
-                        print(f"[GLOBAL MERGE] Merging nuclei {sorted(n1.regions)} + {sorted(n2.regions)} -> {sorted(new_regions)}")
-                        self.nuclei.pop(j)# delete old nuclei, add merged
-                        self.nuclei.pop(i)
-                        self.nuclei.append(new_n)
-                        merged = True
-                        break
-                if merged:
-                    break
+        self.nuclei = self.grouper.group(self, self.link_table.counts_without(self.background)) #remove background links
         return self.nuclei
 
+    def group_links(self, link_counts): #merge nuclei sharing 2+ links with union-find; link_counts: {(r1, r2): multiplicity}
+        region_ids = list(set(r for link in link_counts for r in link)) #initial nuclei, one per region
+        parent = {r: r for r in region_ids}
+        members = {r: [r] for r in region_ids} #root -> regions of its nucleus
+        counts = {r: {} for r in region_ids} #root -> {other root: number of links between the two nuclei}
+        pending = deque() #pairs of nuclei known to share 2+ links
+        for (r1, r2), count in link_counts.items():
+            if r1 == r2:
+                continue
+            counts[r1][r2] = counts[r2][r1] = count
+            if count >= 2:
+                pending.append((r1, r2))
+
+        def find(r): #root of the nucleus holding region r (with path halving)
+            while parent[r] != r:
+                parent[r] = parent[parent[r]]
+                r = parent[r]
+            return r
+
+        merged = set() #roots of nuclei built by merging
+        while pending: # Merge until stable
+            a, b = pending.popleft()
+            self.stats.add("global_pair_checks")
+            a, b = find(a), find(b)
+            if a == b:
+                continue
+            if len(counts[a]) < len(counts[b]): #fold the smaller nucleus into the larger one
+                a, b = b, a
+            if self.trace_level >= self.TRACE:
+                print(f"[GLOBAL MERGE] Merging nuclei {sorted(members[a])} + {sorted(members[b])} -> {sorted(members[a] + members[b])}")
+            parent[b] = a
+            members[a].extend(members.pop(b))
+            for other, count in counts.pop(b).items(): #links of b now connect a to its neighbours
+                del counts[other][b]
+                if other == a:
+                    continue
+                count = counts[a][other] = counts[a].get(other, 0) + count
+                counts[other][a] = count
+                if count >= 2:
+                    pending.append((a, other))
+            merged.add(a)
+            self.stats.add("global_merges")
+
+        #untouched nuclei keep their place, merged ones follow (ordered by their first region, independent of merge order)
+        roots = [r for r in region_ids if r in members and r not in merged]
+        roots += dict.fromkeys(find(r) for r in region_ids if find(r) in merged)
+        nuclei = {r: self.Nucleus(members[r]) for r in roots}
+        for link in link_counts: #a nucleus holds every link touching one of its regions
+            for r in link:
+                nuclei[find(r)].links.add(link)
+        return list(nuclei.values())
+
     def singlebody(self):
-        merged = True
-        while merged:
-            merged = False
-            for n in self.nuclei[:]:
-                if len(n.regions) == 1: #nucleus composed of a single region
-                    single_region = next(iter(n.regions)) 
-                    connected_links = [link for link in n.links if single_region in link] #gets all links from this single region
-                    if len(connected_links) == 1: #if only one link ->merge
-                        other = connected_links[0][0] if connected_links[0][1] == single_region else connected_links[0][1]
-                        # Find the nucleus containing other_region
-                        target = next((nu for nu in self.nuclei if other in nu.regions), None)
-                        if target: # merge single region into target
-                            print(f"[SINGLEBODY MERGE] {n.regions} merged into {target.regions} via {connected_links[0]}")
-                            target.regions.update(n.regions)
-                            target.links.update(n.links)  # inherit all links from the single-region nucleus
-                            self.nuclei.remove(n) #delete merged nucleus
-                            merged = True
-                            break 
+        self.nuclei = self.grouper.merge(self, self.nuclei)
         return self.nuclei
 
+    def merge_single_regions(self, nuclei): #merge single-region nuclei with exactly one link into the nucleus across that link
+        region_to_nucleus = {r: n for n in nuclei for r in n.regions}
+        queue = deque(n for n in nuclei if len(n.regions) == 1) #worklist of candidates, in list order
+        merged = set() #ids of nuclei folded into another one
+        while queue:
+            n = queue.popleft()
+            self.stats.add("singlebody_checks")
+            if len(n.regions) != 1: #became a merge target in the meantime
+                continue
+            single_region = next(iter(n.regions))
+            connected_links = [link for link in n.links if single_region in link] #gets all links from this single region
+            if len(connected_links) == 1: #if only one link ->merge
+                other = connected_links[0][0] if connected_links[0][1] == single_region else connected_links[0][1]
+                target = region_to_nucleus.get(other)
+                if target and target is not n: # merge single region into target
+                    if self.trace_level >= self.TRACE:
+                        print(f"[SINGLEBODY MERGE] {n.regions} merged into {target.regions} via {connected_links[0]}")
+                    target.regions.update(n.regions)
+                    target.links.update(n.links)  # inherit all links from the single-region nucleus
+                    region_to_nucleus[single_region] = target
+                    merged.add(id(n))
+                    self.stats.add("singlebody_merges")
+        nuclei[:] = [n for n in nuclei if id(n) not in merged] #delete merged nuclei
+        return nuclei
+
     def print_bodies(self):
         print("\n" + "="*50)
         print("FINAL BODIES")
@@ -206,27 +1168,594 @@ class SceneUnderstander:
         for idx, n in enumerate(self.nuclei, 1):
             print(f"Body {idx}: Regions = {sorted(n.regions)}")
     
-    def analyze_scene(self, needs_flip):
-        self.create_vertices()
-        self.analyze_vertices(needs_flip)
-        self.global_grouping()
-        self.singlebody()
-        self.print_bodies()
+    class SceneResult: #machine-readable outcome of analyze_scene
+        def __init__(self, vertices, links, nuclei, bodies, background=None):
+            self.vertices = vertices #vertex id -> {"type": ..., "angles": [...]}
+            self.links = links #deduplicated links, sorted
+            self.nuclei = nuclei #region lists after global grouping
+            self.bodies = bodies #region lists after singlebody
+            self.background = background
+
+        def __repr__(self):
+            return f"SceneResult(vertices={len(self.vertices)}, links={len(self.links)}, bodies={self.bodies})"
+
+        def to_dict(self):
+            return {
+                "background": self.background,
+                "vertices": self.vertices,
+                "links": [list(link) for link in self.links],
+                "nuclei": self.nuclei,
+                "bodies": self.bodies
+            }
+
+        def to_json(self, indent=None):
+            return json.dumps(self.to_dict(), indent=indent)
+
+        @classmethod
+        def from_dict(cls, data): #inverse of to_dict, e.g. for results read back from a cache
+            return cls(data["vertices"], [tuple(link) for link in data["links"]], data["nuclei"], data["bodies"], data["background"])
+
+        def to_ndjson(self): #one compact line, for streaming many scenes into a single file
+            return json.dumps(self.to_dict(), separators=(",", ":")) + "\n"
+
+    class RegionGraph: #region adjacency as an edge array plus a region -> body label array, for consumers that skip the pipeline
+        def __init__(self, regions, edges, shared, labels, bodies, background=None, compact=False):
+            self.regions = regions #sorted ids of every region in the scene
+            self.edges = edges #flat (r1, r2) pairs with r1 < r2, sorted: regions on the two sides of at least one drawing edge
+            self.shared = shared #drawing edges between the two regions of each pair
+            self.labels = labels #region id (or position in regions, see compact) -> index into the body list, -1 for the background and regions in no body
+            self.bodies = bodies #number of bodies
+            self.background = background
+            self.compact = compact #labels follow regions (labels[i] is the body of regions[i]) instead of region ids, for negative or sparse ids
+
+        def __repr__(self):
+            return f"RegionGraph(regions={len(self.regions)}, edges={len(self.shared)}, bodies={self.bodies})"
+
+        def __len__(self): #edges
+            return len(self.shared)
+
+        def pairs(self): #(r1, r2, shared edges) per edge
+            edges = self.edges
+            return [(edges[2 * i], edges[2 * i + 1], count) for i, count in enumerate(self.shared)]
+
+        def body_of(self, region): #body index of a region, -1 if it belongs to none
+            if self.compact:
+                i = bisect.bisect_left(self.regions, region)
+                return int(self.labels[i]) if i < len(self.regions) and self.regions[i] == region else -1
+            return int(self.labels[region]) if 0 <= region < len(self.labels) else -1
+
+        def to_dict(self):
+            edges = self.edges
+            return {
+                "background": self.background,
+                "bodies": self.bodies,
+                "regions": [int(r) for r in self.regions],
+                "edges": [[int(edges[i]), int(edges[i + 1])] for i in range(0, len(edges), 2)],
+                "shared": [int(count) for count in self.shared],
+                "labels": [int(label) for label in self.labels],
+                "compact": self.compact
+            }
+
+        def to_json(self, indent=None):
+            return json.dumps(self.to_dict(), indent=indent)
+
+        @classmethod
+        def from_dict(cls, data):
+            return cls(array("q", data["regions"]), array("q", [r for edge in data["edges"] for r in edge]), array("q", data["shared"]), array("q", data["labels"]), data["bodies"], data["background"], data.get("compact", False))
+
+        def save_npz(self, file_name): #int64 arrays: regions, edges (E x 2), shared, labels, and bodies/background scalars (background -1 if none)
+            import numpy
+            numpy.savez(file_name,
+                regions=numpy.asarray(self.regions, dtype=numpy.int64),
+                edges=numpy.asarray(self.edges, dtype=numpy.int64).reshape(-1, 2),
+                shared=numpy.asarray(self.shared, dtype=numpy.int64),
+                labels=numpy.asarray(self.labels, dtype=numpy.int64),
+                bodies=numpy.int64(self.bodies),
+                compact=numpy.bool_(self.compact),
+                background=numpy.int64(-1 if self.background is None else self.background))
+
+        def dump(self, file_name): #.npz writes save_npz's arrays, anything else JSON
+            if file_name.endswith(".npz"):
+                self.save_npz(file_name)
+                return
+            with open(file_name, "w") as file:
+                file.write(self.to_json())
+
+        @classmethod
+        def load(cls, file_name): #read back a dump; arrays from .npz stay numpy arrays
+            if not file_name.endswith(".npz"):
+                with open(file_name, "r") as file:
+                    return cls.from_dict(json.load(file))
+            import numpy
+            with numpy.load(file_name) as data:
+                background = int(data["background"])
+                compact = bool(data["compact"]) if "compact" in data else False
+                return cls(data["regions"], data["edges"].reshape(-1), data["shared"], data["labels"], int(data["bodies"]), None if background < 0 else background, compact)
+
+    def region_graph(self): #RegionGraph of the analyzed scene, built once from the kind lists and the final bodies
+        if self.graph is not None:
+            return self.graph
+        table = self.vertices
+        np = numpy_for(len(table.neighbors))
+        if np is None:
+            shared = {}
+            regions_column, neighbors_column, defined = table.regions, table.neighbors, table.defined
+            for row in table.order:
+                count = table.neighbor_count[row]
+                if count != table.region_count[row]: #malformed kind list: no wedge per neighbor
+                    continue
+                neighbor_start, region_start = table.neighbor_start[row], table.region_start[row]
+                previous = regions_column[region_start + count - 1]
+                for i in range(count): #the edge to neighbor i runs between wedges i - 1 and i
+                    region = regions_column[region_start + i]
+                    neighbor = neighbors_column[neighbor_start + i]
+                    if region != previous and not (defined[neighbor] and neighbor < row): #each drawing edge once, from its lower row
+                        pair = (previous, region) if previous < region else (region, previous)
+                        shared[pair] = shared.get(pair, 0) + 1
+                    previous = region
+            pairs = sorted(shared)
+            edges = array("q", [r for pair in pairs for r in pair])
+            shared = array("q", [shared[pair] for pair in pairs])
+            regions = array("q", sorted(set(self.region_array())))
+        else:
+            rows = np.frombuffer(table.order, dtype=np.int64)
+            counts = np.frombuffer(table.neighbor_count, dtype=np.int32)[rows].astype(np.int64)
+            keep = counts == np.frombuffer(table.region_count, dtype=np.int32)[rows]
+            rows, counts = rows[keep], counts[keep]
+            first = np.repeat(np.cumsum(counts) - counts, counts)
+            slot = np.arange(counts.sum()) - first #position in the vertex's kind list
+            owner = np.repeat(rows, counts)
+            region_base = np.frombuffer(table.region_start, dtype=np.int64)[owner]
+            regions_column = np.frombuffer(table.regions, dtype=np.int64)
+            region = regions_column[region_base + slot]
+            previous = regions_column[region_base + (slot - 1) % np.repeat(counts, counts)]
+            neighbor = np.frombuffer(table.neighbors, dtype=np.int64)[np.frombuffer(table.neighbor_start, dtype=np.int64)[owner] + slot]
+            keep = (region != previous) & ~((np.frombuffer(table.defined, dtype=np.uint8)[neighbor] == 1) & (neighbor < owner))
+            low, high = np.minimum(region, previous)[keep], np.maximum(region, previous)[keep]
+            if len(low) and high.max() < 1 << 31: #one packed key per pair sorts by (r1, r2) without unique's row mode
+                keys, shared = np.unique((low << 32) | high, return_counts=True)
+                pairs = np.stack((keys >> 32, keys & 0xFFFFFFFF), axis=1)
+            else:
+                pairs, shared = np.unique(np.stack((low, high), axis=1), axis=0, return_counts=True)
+            edges = array("q", pairs.astype(np.int64).tobytes())
+            shared = array("q", shared.astype(np.int64).tobytes())
+            regions = array("q", np.unique(self.region_array()).astype(np.int64).tobytes())
+        compact = bool(regions) and (regions[0] < 0 or regions[-1] >= 16 * len(regions) + 1024) #ids cannot index a label array of sensible size
+        if compact:
+            position = {r: i for i, r in enumerate(regions)}
+            labels = array("q", [-1]) * len(regions)
+        else:
+            position = None
+            labels = array("q", [-1]) * (regions[-1] + 1 if regions else 0)
+        for body, nucleus in enumerate(self.nuclei): #same order as SceneResult.bodies
+            for r in nucleus.regions:
+                labels[r if position is None else position[r]] = body
+        self.graph = self.RegionGraph(regions, edges, shared, labels, len(self.nuclei), self.background, compact)
+        return self.graph
+
+    def analyze_scene(self, needs_flip=None, vectorized=False, stats_file=None, cache=None, workers=None): #needs_flip None: detect it; cache: a SceneCache consulted before classifying; workers: processes for classification and linking
+        self.stats.reset(keep=self.DOCUMENT_STATS) #stats describe this analysis, not the sum of earlier ones
+        with self.stats.timed("create_vertices"):
+            self.create_vertices()
+        if needs_flip is None:
+            if self.detected_flip is None:
+                with self.stats.timed("detect_flip"):
+                    self.detected_flip = self.detect_needs_flip()
+            needs_flip = self.detected_flip
+        self.cache_hit = False
+        if cache is not None:
+            with self.stats.timed("cache_lookup"):
+                key = self.scene_key(needs_flip)
+                cached = cache.get(key)
+            self.stats.add("cache_hits" if cached is not None else "cache_misses")
+            if cached is not None:
+                return self.use_cached_result(cached, needs_flip, stats_file)
+        type_cache = self.classifier.type_cache
+        before = type_cache.counters() if type_cache is not None else {}
+        with self.stats.timed("analyze_vertices"):
+            self.analyze_vertices(needs_flip, vectorized, workers)
+        if type_cache is not None: #this scene's share of the (possibly reused) cache's counters
+            for counter, count in type_cache.counters().items():
+                self.stats.add(counter, count - before[counter])
+        with self.stats.timed("global_grouping"):
+            self.global_grouping()
+        self.global_nuclei = [sorted(n.regions) for n in self.nuclei] #singlebody merges in place, keep the global grouping
+        with self.stats.timed("singlebody"):
+            self.singlebody()
+        for code, vertex_type in enumerate(self.vertices.TYPES[1:], 1): #count type codes straight from the table
+            self.stats.add(f"vertices_{vertex_type}", self.vertices.types.count(code))
+        self.stats.add("links_generated", self.link_table.total())
+        self.stats.add("links_deduplicated", len(self.link_table))
+        self.stats.add("nuclei", len(self.global_nuclei))
+        self.stats.add("bodies", len(self.nuclei))
+        if stats_file:
+            self.stats.dump(stats_file)
+        if self.trace_level >= self.INFO:
+            self.print_bodies()
+        self.result = self.scene_result()
+        self.analyzed = True
+        self.region_bodies = None
+        self.graph = None
+        if cache is not None:
+            cache.put(key, self.result.to_dict())
+        return self.result
+
+    def scene_key(self, needs_flip): #content hash of the strategies, the vertices as analyzed (coords as floats, parsed kind lists), background and needs_flip
+        import hashlib
+        table = self.vertices
+        ids = table.ids
+        strategies = (self.classifier.name, self.linker.name, self.grouper.name)
+        digest = hashlib.blake2b(repr((self.CACHE_VERSION, strategies, self.background, bool(needs_flip))).encode(), digest_size=20)
+        for row in table.order:
+            start = table.neighbor_start[row]
+            neighbors = [ids[n] for n in table.neighbors[start:start + table.neighbor_count[row]]]
+            start = table.region_start[row]
+            regions = table.regions[start:start + table.region_count[row]].tolist()
+            digest.update(repr((ids[row], table.xs[row], table.ys[row], neighbors, regions)).encode())
+        return digest.hexdigest()
+
+    def use_cached_result(self, data, needs_flip, stats_file=None): #restore types, angles and bodies from a cached result dict
+        self.result = self.SceneResult.from_dict(data)
+        self.region_bodies = None
+        self.graph = None
+        self.needs_flip = needs_flip
+        self.cache_hit = True
+        self.analyzed = True
+        for vid, info in self.result.vertices.items():
+            if vid in self.vertices:
+                vertex = self.vertices[vid]
+                vertex.vertex_type = info["type"]
+                vertex.angles = info["angles"]
+        self.global_nuclei = [list(n) for n in self.result.nuclei]
+        self.nuclei = [self.Nucleus(body) for body in self.result.bodies]
+        for code, vertex_type in enumerate(self.vertices.TYPES[1:], 1):
+            self.stats.add(f"vertices_{vertex_type}", self.vertices.types.count(code))
+        self.stats.add("links_deduplicated", len(self.result.links))
+        self.stats.add("nuclei", len(self.global_nuclei))
+        self.stats.add("bodies", len(self.nuclei))
+        if stats_file:
+            self.stats.dump(stats_file)
+        if self.trace_level >= self.INFO:
+            self.print_bodies()
+        return self.result
+
+    def scene_result(self): #SceneResult for the current state (also after incremental edits)
+        return self.SceneResult(
+            {v.id: {"type": v.vertex_type, "angles": v.angles} for v in self.vertices.values()},
+            sorted(self.link_table.counts),
+            [list(n) for n in self.global_nuclei],
+            [sorted(n.regions) for n in self.nuclei],
+            self.background
+        )
+
+    def check_editable(self): #called by every edit before it changes anything
+        if self.analyzed and self.cache_hit: #a cached result has no per-vertex links to patch
+            raise RuntimeError("incremental edits need a scene analyzed without a cache hit")
+
+    def add_vertex(self, vertex_id, coords, kind_list): #incremental edits: re-analyze only around the changed vertex
+        self.check_editable()
+        self.vertices.add(vertex_id, coords, kind_list)
+        return self.update_vertices([vertex_id])
+
+    def move_vertex(self, vertex_id, coords):
+        self.check_editable()
+        row = self.vertices.index[vertex_id]
+        self.vertices.xs[row], self.vertices.ys[row] = coords
+        return self.update_vertices([vertex_id])
+
+    def set_kind_list(self, vertex_id, kind_list):
+        self.check_editable()
+        old_neighbors = self.vertices[vertex_id].neighbors
+        self.vertices.set_kind_list(self.vertices.index[vertex_id], kind_list)
+        return self.update_vertices([vertex_id], old_neighbors)
+
+    def remove_vertex(self, vertex_id):
+        self.check_editable()
+        old_neighbors = self.vertices[vertex_id].neighbors
+        self.vertices.remove(vertex_id)
+        self.file_info.pop(vertex_id, None)
+        return self.update_vertices([vertex_id], old_neighbors)
+
+    def update_vertices(self, vertex_ids, old_neighbors=()): #reclassify the vertices and their neighbors, then regroup the regions whose links changed
+        self.check_editable()
+        if self.spatial is not None: #re-file the edited rows (added, moved or removed)
+            for vid in vertex_ids:
+                self.spatial.update(self.vertices.index[vid])
+        if self.incremental is None: #region -> current nucleus / body
+            global_of = {r: n for n in self.global_nuclei for r in n}
+            body_of = {r: n for n in self.nuclei for r in n.regions}
+            slots = {id(n): i for entries in (self.global_nuclei, self.nuclei) for i, n in enumerate(entries)} #list positions
+            self.incremental = (global_of, body_of, slots)
+        global_of, body_of, slots = self.incremental
+        link_table = self.link_table
+        adjacency = link_table.region_adjacency() #kept up to date by the link table, background included
+
+        affected = set(vertex_ids).union(old_neighbors)
+        for vid in vertex_ids:
+            if vid in self.vertices:
+                affected.update(self.vertices[vid].neighbors) #their angles depend on this vertex
+        delta = {} #link -> change in multiplicity
+        for vid in affected:
+            for link in link_table.remove(vid):
+                delta[link] = delta.get(link, 0) - 1
+            if vid not in self.vertices:
+                continue
+            v = self.vertices[vid]
+            if all(n in self.vertices for n in v.neighbors):
+                self.compute_directions(self.needs_flip, [v.row])
+                self.classifier.classify(v, self.vertices, self.needs_flip)
+                links = self.linker.link(v, self.background)
+            else: #a neighbor was removed, wait for the kind list to be fixed
+                v.vertex_type, v.angles, links = None, [], []
+            link_table.add(vid, links)
+            for link in links:
+                delta[link] = delta.get(link, 0) + 1
+        self.result = None
+        self.region_bodies = None
+        self.graph = None
+
+        background = self.background
+        touched = set()
+        for (r1, r2), change in delta.items():
+            if change and background not in (r1, r2):
+                touched.update((r1, r2))
+        if not touched: #same links, same bodies
+            return []
+        counts = link_table.counts
+
+        def nucleus_links(regions): #every link touching the regions, background left out, as group_links gives a nucleus
+            links = {(r, r) for r in regions if (r, r) in counts}
+            links.update((r1, r2) if r1 < r2 else (r2, r1) for r1 in regions for r2 in adjacency.get(r1, ()) if r2 != background)
+            return links
+
+        #old nuclei around a changed link may split: regroup them region by region. Every other old nucleus is still
+        #a valid grouping of its regions, so it enters the grouper contracted to one node (its first region).
+        exploded = {r for t in touched for r in global_of.get(t, (t,))}
+
+        def node(r): #grouper node of a region
+            return r if r in exploded or r not in global_of else global_of[r][0]
+
+        def members(v): #regions of a grouper node
+            return (v,) if v in exploded or v not in global_of else global_of[v]
+
+        def node_neighbors(v):
+            return {node(r2) for r in members(v) for r2 in adjacency.get(r, ()) if r2 != background}
+
+        nodes, frontier = set(exploded), exploded
+        while True: #grow by the neighbors of everything that may merge, until no new nucleus reaches past the nodes
+            for v in frontier:
+                nodes.update(node_neighbors(v))
+            links = {}
+            for v in nodes:
+                for r in members(v):
+                    if v == r and (r, r) in counts: #a region linked only to itself is still a nucleus
+                        links[r, r] = counts[r, r]
+                    for r2, count in adjacency.get(r, {}).items():
+                        w = node(r2)
+                        if r < r2 and r2 != background and w != v and w in nodes:
+                            pair = (v, w) if v < w else (w, v)
+                            links[pair] = links.get(pair, 0) + count
+            groups = self.grouper.group(self, links)
+            frontier = {v for n in groups if len(n.regions) > 1 for v in n.regions if not node_neighbors(v) <= nodes}
+            if not frontier:
+                break
+
+        #nuclei that are not an unchanged contracted node replace the old nuclei of their nodes
+        fresh = [n for n in groups if len(n.regions) > 1 or next(iter(n.regions)) in exploded]
+        stale = {id(global_of[r]): global_of[r] for r in exploded if r in global_of}
+        stale.update((id(global_of[v]), global_of[v]) for n in fresh for v in n.regions if v not in exploded)
+        global_nuclei, nuclei = [], []
+        for n in fresh:
+            regions = sorted(r for v in n.regions for r in members(v))
+            global_nuclei.append(regions)
+            nucleus = self.Nucleus(regions)
+            nucleus.links = nucleus_links(regions)
+            nuclei.append(nucleus)
+
+        #bodies: the old bodies of every regrouped region, plus the bodies that a new single-region nucleus may fold into
+        changed = exploded.union(*global_nuclei)
+        old_bodies = {id(body_of[r]): body_of[r] for r in changed if r in body_of}
+        for nucleus in nuclei:
+            if len(nucleus.regions) == 1:
+                region = next(iter(nucleus.regions))
+                partners = [r for link in nucleus.links if region in link for r in link if r != region]
+                if len(partners) == 1 and partners[0] in body_of:
+                    old_bodies.setdefault(id(body_of[partners[0]]), body_of[partners[0]])
+        kept = {} #unchanged old nuclei inside those bodies, regrouped into bodies with the new ones
+        for body in old_bodies.values():
+            for r in body.regions:
+                old = global_of.get(r)
+                if old is not None and id(old) not in stale and id(old) not in kept:
+                    kept[id(old)] = old
+        for old in kept.values():
+            nucleus = self.Nucleus(old)
+            nucleus.links = nucleus_links(old)
+            nuclei.append(nucleus)
+        bodies = self.grouper.merge(self, nuclei)
+
+        def replace(entries, stale, fresh): #reuse the slots of stale entries, then fill leftover holes from the end
+            free = sorted(slots.pop(i) for i in stale)
+            for n in fresh:
+                if free:
+                    entries[free[0]] = n
+                    slots[id(n)] = free.pop(0)
+                else:
+                    slots[id(n)] = len(entries)
+                    entries.append(n)
+            for i in reversed(free):
+                last = entries.pop()
+                if i < len(entries):
+                    entries[i] = last
+                    slots[id(last)] = i
+
+        for old in stale.values():
+            for r in old:
+                del global_of[r]
+        replace(self.global_nuclei, stale, global_nuclei)
+        for body in old_bodies.values():
+            for r in body.regions:
+                body_of.pop(r, None)
+        replace(self.nuclei, set(old_bodies), bodies)
+        global_of.update((r, n) for n in global_nuclei for r in n)
+        body_of.update((r, n) for n in bodies for r in n.regions)
+        return bodies
+
+    def spatial_index(self, cell_size=None): #grid over the current vertices, kept up to date by later edits
+        if self.spatial is None or (cell_size is not None and cell_size != self.spatial.cell_size):
+            self.create_vertices() #vertices loaded since the last analysis
+            self.spatial = self.SpatialIndex(self.vertices, cell_size)
+        return self.spatial
+
+    def vertex_bodies(self, vertex_id): #final bodies (sorted region lists) that the regions around a vertex belong to
+        if self.region_bodies is None:
+            self.region_bodies = {r: sorted(n.regions) for n in self.nuclei for r in n.regions}
+        bodies = []
+        for r in self.vertices[vertex_id].regions:
+            body = self.region_bodies.get(r)
+            if body is not None and body not in bodies:
+                bodies.append(body)
+        return bodies
+
+    def nearest_vertex(self, x, y, max_distance=None): #(vertex id, bodies) of the junction closest to a point, or None
+        row = self.spatial_index().nearest(x, y, max_distance)
+        if row is None:
+            return None
+        vid = self.vertices.ids[row]
+        return vid, self.vertex_bodies(vid)
+
+    def vertices_near(self, x, y, radius): #[(vertex id, bodies)] within radius of a point, nearest first
+        ids = self.vertices.ids
+        return [(ids[row], self.vertex_bodies(ids[row])) for row in self.spatial_index().within(x, y, radius)]
+
+    def vertices_in_box(self, x0, y0, x1, y1): #[(vertex id, bodies)] inside a box
+        ids = self.vertices.ids
+        return [(ids[row], self.vertex_bodies(ids[row])) for row in self.spatial_index().box(x0, y0, x1, y1)]
+
+    def merge_near_duplicates(self, tolerance): #merge junctions within tolerance of each other; returns [(kept id, [merged ids])]
+        self.check_editable()
+        table = self.vertices
+        pairs = self.spatial_index().pairs_within(tolerance)
+        lists = {} #vertex id -> (neighbors, regions) being rewritten
+        merged_into = {}
+        old_neighbors = set()
+
+        def get(vid):
+            if vid not in lists:
+                lists[vid] = (table[vid].neighbors, table[vid].regions)
+                old_neighbors.update(lists[vid][0])
+            return lists[vid]
+
+        def find(vid):
+            while vid in merged_into:
+                vid = merged_into[vid]
+            return vid
+
+        def collapse(neighbors, regions): #drop repeated consecutive neighbors along with the (degenerate) region between them
+            i = 0
+            while len(neighbors) > 1 and i < len(neighbors):
+                if neighbors[i] == neighbors[(i + 1) % len(neighbors)]:
+                    del neighbors[(i + 1) % len(neighbors)]
+                    if i < len(regions):
+                        del regions[i]
+                else:
+                    i += 1
+
+        for row_a, row_b in pairs:
+            a, b = find(table.ids[row_a]), find(table.ids[row_b])
+            if a == b:
+                continue
+            a_neighbors, a_regions = get(a)
+            b_neighbors, b_regions = get(b)
+            if a_neighbors.count(b) == 1 and b_neighbors.count(a) == 1: #joined by a short edge: contract it, splicing b's wedges into a's
+                j, m, k = a_neighbors.index(b), b_neighbors.index(a), len(b_neighbors)
+                others = [b_neighbors[(m + 1 + i) % k] for i in range(k - 1)]
+                a_neighbors[j:j + 1] = others
+                if k == 1: #b was a dead end inside one region
+                    del a_regions[j]
+                else:
+                    a_regions[j:j] = [b_regions[(m + 1 + i) % k] for i in range(k - 2)]
+            elif set(a_neighbors) == set(b_neighbors): #the same junction listed twice
+                others = b_neighbors
+            else: #two distinct junctions that happen to be close
+                continue
+            merged_into[b] = a
+            for c in others:
+                if c != a and c in table:
+                    c_neighbors, c_regions = get(c)
+                    c_neighbors[:] = [a if n == b else n for n in c_neighbors]
+                    collapse(c_neighbors, c_regions)
+            collapse(a_neighbors, a_regions)
+
+        merges = {}
+        for b in merged_into:
+            merges.setdefault(find(b), []).append(b)
+        changed = [vid for vid in lists if vid not in merged_into]
+        for vid in changed:
+            neighbors, regions = lists[vid]
+            kind_list = [item for pair in zip(neighbors, regions) for item in pair] + neighbors[:1] + regions[len(neighbors):]
+            table.set_kind_list(table.index[vid], kind_list)
+            if vid in self.file_info: #keep file_info in step with the table
+                self.file_info[vid]["kind_list"] = kind_list
+        for b in merged_into:
+            table.remove(b)
+            self.file_info.pop(b, None)
+            self.spatial.update(table.index[b])
+        if self.analyzed: #re-analyze around the merges
+            self.update_vertices(changed, old_neighbors.union(merged_into))
+        return [(table.ids[row], merges[table.ids[row]]) for row in table.order if table.ids[row] in merges]
+
+class SharedLayout: #byte offsets of the sections in analyze_vertices_parallel's shared memory block
+    def __init__(self, input_size, rows, slots):
+        padded = rows + -rows % 8
+        self.input_size = input_size #binary scene
+        self.types = input_size
+        self.angle_count = self.types + padded
+        self.angles = self.angle_count + padded
+        self.directions = self.angles + 8 * slots
+        self.id_offsets = self.directions + 8 * slots
+        self.size = self.id_offsets + 8 * (rows + 1)
+        self.rows = rows
+
+def analyze_shard(shm_name, layout, start, stop, strategies, needs_flip, vectorized): #worker for analyze_vertices_parallel: rows table.order[start:stop], read and written in place
+    import pickle
+    from multiprocessing import shared_memory
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        with memoryview(shm.buf) as buf:
+            views = [
+                buf[:layout.input_size], buf[layout.id_offsets:layout.size].cast("q"),
+                buf[layout.types:layout.types + layout.rows], buf[layout.angle_count:layout.angle_count + layout.rows],
+                buf[layout.angles:layout.directions].cast("d"), buf[layout.directions:layout.id_offsets].cast("d")
+            ]
+            table, background = SceneUnderstander.VertexTable.view_binary(*views)
+            table.order = table.order[start:stop]
+            classifier, linker, grouper = strategies
+            scene = SceneUnderstander(classifier=classifier, linker=linker, grouper=grouper, background_method=None)
+            scene.vertices = table
+            scene.background = background
+            scene.analyze_vertices(needs_flip, vectorized) #types, angles and directions of different shards never overlap
+            links = pickle.dumps(scene.link_table, pickle.HIGHEST_PROTOCOL) #the parent unpickles with the garbage collector paused
+            del scene, table #drop the column views before the block is closed
+            for view in views:
+                view.release()
+        return links
+    finally:
+        shm.close()
 
 def main():
     print("\n" + "="*50)
     print("CUBE")
     print("="*50)
-    scene_understander = SceneUnderstander()
+    scene_understander = SceneUnderstander(SceneUnderstander.TRACE)
     scene_understander.load_file("cube.json")
-    scene_understander.analyze_scene(False)
+    scene_understander.analyze_scene() #needs_flip detected: False
     
     print("\n" + "="*50)
     print("ONE")
     print("="*50)
-    scene_understander = SceneUnderstander()
+    scene_understander = SceneUnderstander(SceneUnderstander.TRACE)
     scene_understander.load_file("one.json")
-    scene_understander.analyze_scene(True)
+    scene_understander.analyze_scene() #needs_flip detected: True
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,72 @@
+import argparse
+import json
+import sys
+import time
+
+from scene_benchmark import generate_scene
+from scene_strategies import VARIANTS
+from scene_understanding_final import SceneUnderstander
+
+FLIP_FLAGS = {"": None, "flip": True, "noflip": False} #FILE suffix -> needs_flip; None detects it like the other entry points
+
+def load_inputs(files, sizes): #[(name, scene document, needs_flip)]; FILE:flip / FILE:noflip force a downward / upward y axis
+    inputs = []
+    for spec in files:
+        file_name, _, flag = spec.partition(":")
+        if flag not in FLIP_FLAGS:
+            raise ValueError(f"unknown flag {flag!r} in {spec!r}, expected FILE, FILE:flip or FILE:noflip")
+        with open(file_name, "r") as file:
+            inputs.append((file_name, json.load(file), FLIP_FLAGS[flag]))
+    for size in sizes:
+        inputs.append((f"generated-{size}", generate_scene(size)[0], False))
+    return inputs
+
+def run_variant(variant, data, needs_flip, repeat): #best-of-repeat analysis time and the last result; needs_flip None: detected in every run
+    times = []
+    for _ in range(repeat):
+        scene_understander = SceneUnderstander(variant=variant)
+        scene_understander.load_data(data)
+        start = time.perf_counter()
+        result = scene_understander.analyze_scene(needs_flip)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+def compare(reference, result): #differences of result against the reference variant's result
+    types = sum(1 for v, info in reference.vertices.items() if result.vertices.get(v, {}).get("type") != info["type"])
+    links = set(reference.links) ^ set(result.links)
+    bodies = {tuple(b) for b in reference.bodies} ^ {tuple(b) for b in result.bodies}
+    return {"type_diffs": types, "link_diffs": len(links), "body_diffs": len(bodies), "same_bodies": not bodies}
+
+def main():
+    parser = argparse.ArgumentParser(description="Run every pipeline variant on the same scenes and compare speed and results.")
+    parser.add_argument("files", nargs="*", default=["cube.json", "one.json", "trial.json"], help="scene files; the y axis is detected per scene unless given as FILE:flip (downward) or FILE:noflip (upward)")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1000, 10000], help="also run generated scenes of about these vertex counts")
+    parser.add_argument("--variants", nargs="+", choices=sorted(VARIANTS), default=sorted(VARIANTS))
+    parser.add_argument("--repeat", type=int, default=3, help="runs per variant, the fastest is reported")
+    parser.add_argument("--json", help="also write the records to this file")
+    args = parser.parse_args()
+    for spec in args.files:
+        if spec.partition(":")[2] not in FLIP_FLAGS:
+            parser.error(f"unknown flag in {spec!r}, expected FILE, FILE:flip or FILE:noflip")
+
+    reference = args.variants[0]
+    print(f"reference variant: {reference}")
+    print(f"{'scene':<18} {'variant':<20} {'strategies':<40} {'seconds':>9} {'types':>6} {'links':>6} {'bodies':>6}")
+    records = []
+    for name, data, needs_flip in load_inputs(args.files, args.sizes):
+        baseline = None
+        for variant in args.variants:
+            seconds, result = run_variant(variant, data, needs_flip, args.repeat)
+            if baseline is None:
+                baseline = result
+            diffs = compare(baseline, result)
+            records.append({"scene": name, "variant": variant, "strategies": VARIANTS[variant], "seconds": seconds, "bodies": result.bodies, **diffs})
+            print(f"{name:<18} {variant:<20} {'/'.join(VARIANTS[variant]):<40} {seconds:>9.4f} "
+                  f"{diffs['type_diffs']:>6} {diffs['link_diffs']:>6} {diffs['body_diffs']:>6}", flush=True)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(records, file, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
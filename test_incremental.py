@@ -0,0 +1,54 @@
+import os
+import random
+
+import pytest
+
+from scene_benchmark import generate_scene
+from scene_understanding_final import SceneUnderstander
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def load(name):
+    scene = SceneUnderstander()
+    scene.load_file(os.path.join(HERE, name))
+    return scene
+
+def fresh_result(scene): #analyze the scene's current vertices from scratch
+    document = {"vertex-data": [{"id": v.id, "coords": list(v.coords), "kind-list": v.kind_list} for v in scene.vertices.values()], "background": scene.background}
+    fresh = SceneUnderstander(variant=scene.variant)
+    fresh.load_data(document)
+    return fresh.analyze_scene(scene.needs_flip)
+
+def canonical(result):
+    return result.vertices, sorted(result.links), sorted(result.nuclei), sorted(result.bodies)
+
+def random_edit(scene, rng, xs, ys):
+    vid = rng.choice(list(scene.vertices))
+    edit = rng.randrange(3)
+    if edit == 0:
+        scene.move_vertex(vid, (rng.uniform(min(xs), max(xs)), rng.uniform(min(ys), max(ys))))
+    elif edit == 1: #relabel the wedges with regions from anywhere in the scene, chaining distant bodies together
+        vertex = scene.vertices[vid]
+        regions = sorted(set(scene.region_array()))
+        kind_list = [item for n in vertex.neighbors for item in (n, rng.choice(regions))] + vertex.neighbors[:1]
+        scene.set_kind_list(vid, kind_list)
+    else:
+        vertex = scene.vertices[vid]
+        coords, kind_list = vertex.coords, vertex.kind_list
+        scene.remove_vertex(vid)
+        scene.add_vertex(vid, coords, kind_list)
+
+@pytest.mark.parametrize("name, variant", [("trial.json", "final"), ("one.json", "final"), ("generated", "final"), ("generated", "global")])
+def test_random_edits_match_fresh_analysis(name, variant):
+    rng = random.Random(12)
+    if name == "generated":
+        scene = SceneUnderstander(variant=variant)
+        scene.load_data(generate_scene(300)[0])
+    else:
+        scene = load(name)
+    scene.analyze_scene()
+    xs = [v.coords[0] for v in scene.vertices.values()]
+    ys = [v.coords[1] for v in scene.vertices.values()]
+    for _ in range(60):
+        random_edit(scene, rng, xs, ys)
+        assert canonical(scene.scene_result()) == canonical(fresh_result(scene))
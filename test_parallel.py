@@ -0,0 +1,20 @@
+import pytest
+
+from scene_benchmark import generate_scene
+from scene_understanding_final import SceneUnderstander
+
+@pytest.mark.parametrize("variant, vectorized", [("final", False), ("final", True), ("global", False)])
+def test_workers_match_serial_analysis(variant, vectorized):
+    if vectorized:
+        pytest.importorskip("numpy")
+    document = generate_scene(600)[0]
+    serial = SceneUnderstander(variant=variant)
+    serial.load_data(document)
+    expected = serial.analyze_scene(vectorized=vectorized)
+    sharded = SceneUnderstander(variant=variant)
+    sharded.load_data(document)
+    result = sharded.analyze_scene(vectorized=vectorized, workers=2)
+    assert sharded.stats.counters["shards"] == 2
+    assert result.to_dict() == expected.to_dict()
+    assert sharded.link_table.sources == serial.link_table.sources
+    assert sharded.vertices.types == serial.vertices.types
@@ -0,0 +1,94 @@
+import os
+
+import pytest
+
+from scene_understanding_final import SceneUnderstander
+
+CUBE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cube.json")
+
+def analyzed_cube():
+    scene = SceneUnderstander()
+    scene.load_file(CUBE)
+    scene.analyze_scene()
+    scene.spatial_index() #built before the edits, so they must keep it current
+    return scene
+
+def test_edits_refile_spatial_index():
+    scene = analyzed_cube()
+    scene.move_vertex("A", (100, 100))
+    assert [vid for vid, _ in scene.vertices_in_box(90, 90, 110, 110)] == ["A"]
+    assert scene.vertices_in_box(0, 0, 2, 2) == []
+
+    scene.add_vertex("Z", (50, 50), ["A", 1, "A"])
+    assert [vid for vid, _ in scene.vertices_near(50, 50, 1)] == ["Z"]
+
+    scene.remove_vertex("C")
+    assert scene.nearest_vertex(3, 7)[0] != "C"
+    assert scene.vertices_near(3, 7, 0.5) == []
+
+def test_merge_refiles_spatial_index():
+    scene = analyzed_cube()
+    scene.add_vertex("E2", (6.01, 5.0), ["D", 2, "B", 1, "G", 3, "D"])
+    merges = scene.merge_near_duplicates(0.1)
+    assert merges == [("E", ["E2"])]
+    assert scene.nearest_vertex(6.01, 5.0)[0] == "E"
+
+SPLIT_FORK = { #a fork at Y drawn as a T at Y plus an L at X, 0.05 away; no links until X is merged into Y
+    "vertex-data": [
+        {"id": "Y", "coords": [0, 0], "kind-list": ["X", 1, "Q", 2, "P", 3, "X"]},
+        {"id": "X", "coords": [0.05, 0], "kind-list": ["Y", 3, "R", 1, "Y"]},
+        {"id": "P", "coords": [-5, 0], "kind-list": ["Y", 2, "Y"]},
+        {"id": "Q", "coords": [0, 5], "kind-list": ["Y", 1, "Y"]},
+        {"id": "R", "coords": [3, -4], "kind-list": ["X", 3, "X"]}
+    ],
+    "background": 4
+}
+
+def test_merge_reanalyzes_scene_without_links():
+    scene = SceneUnderstander()
+    scene.load_data(SPLIT_FORK)
+    assert scene.analyze_scene().links == []
+    assert scene.merge_near_duplicates(0.1) == [("Y", ["X"])]
+
+    merged = {"vertex-data": [
+        {"id": "Y", "coords": [0, 0], "kind-list": ["R", 1, "Q", 2, "P", 3, "R"]},
+        {"id": "P", "coords": [-5, 0], "kind-list": ["Y", 2, "Y"]},
+        {"id": "Q", "coords": [0, 5], "kind-list": ["Y", 1, "Y"]},
+        {"id": "R", "coords": [3, -4], "kind-list": ["Y", 3, "Y"]}
+    ], "background": 4}
+    fresh = SceneUnderstander()
+    fresh.load_data(merged)
+    expected = fresh.analyze_scene()
+    result = scene.scene_result()
+    assert result.vertices["Y"]["type"] == "FORK"
+    assert result.to_dict() == expected.to_dict()
+
+def test_merge_after_cache_hit_leaves_scene_unchanged(tmp_path):
+    from scene_cache import SceneCache
+    cache = SceneCache(str(tmp_path))
+    first = SceneUnderstander()
+    first.load_data(SPLIT_FORK)
+    first.analyze_scene(cache=cache)
+    scene = SceneUnderstander()
+    scene.load_data(SPLIT_FORK)
+    scene.analyze_scene(cache=cache)
+    assert scene.cache_hit
+    with pytest.raises(RuntimeError):
+        scene.merge_near_duplicates(0.1)
+    assert "X" in scene.vertices
+    assert scene.vertices["Y"].neighbors == ["X", "Q", "P"]
+
+def test_edits_after_cache_hit_leave_scene_unchanged(tmp_path):
+    from scene_cache import SceneCache
+    cache = SceneCache(str(tmp_path))
+    analyzed_cube().analyze_scene(cache=cache)
+    scene = analyzed_cube()
+    scene.analyze_scene(cache=cache)
+    assert scene.cache_hit
+    for edit in (lambda: scene.move_vertex("A", (100, 100)), lambda: scene.add_vertex("Z", (50, 50), ["A", 1, "A"]),
+                 lambda: scene.set_kind_list("C", ["B", 2, "B"]), lambda: scene.remove_vertex("C")):
+        with pytest.raises(RuntimeError):
+            edit()
+    assert scene.vertices["A"].coords == (1.0, 1.0)
+    assert "Z" not in scene.vertices and scene.vertices["C"].neighbors == ["B", "D"]
+    assert [vid for vid, _ in scene.vertices_near(3, 7, 0.5)] == ["C"]